@@ -0,0 +1,149 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+
+class TokenBucket:
+    """Tokens left for one key and when they were last refilled"""
+
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated_at = now
+
+
+class RateLimiter:
+    """Token buckets per key (session id, client IP), bounded to ``max_keys`` recently seen keys"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int):
+        self.rate = rate_per_minute / 60.0
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """Take a token for ``key``; returns 0 when allowed, else seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.burst, now)
+                if len(self._buckets) > self.max_keys:
+                    # A forgotten key simply starts again with a full bucket
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated_at) * self.rate)
+                bucket.updated_at = now
+            if bucket.tokens >= 1.0:
+                bucket.tokens -= 1.0
+                return 0.0
+            return (1.0 - bucket.tokens) / self.rate
+
+
+class InFlightSlot:
+    """One admitted LLM turn; ``release`` is idempotent"""
+
+    __slots__ = ("_limiter",)
+
+    def __init__(self, limiter: "InFlightLimiter"):
+        self._limiter = limiter
+
+    def release(self):
+        if self._limiter is not None:
+            self._limiter._release()
+            self._limiter = None
+
+
+class InFlightLimiter:
+    """Caps concurrent LLM turns; excess turns are rejected instead of queued"""
+
+    def __init__(self, limit: int, retry_after_seconds: float):
+        self.limit = limit
+        self.retry_after_seconds = retry_after_seconds
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> Optional[InFlightSlot]:
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return None
+        self.in_flight += 1
+        return InFlightSlot(self)
+
+    def _release(self):
+        self.in_flight -= 1
+
+
+def retry_after_header(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class PayloadTooLarge(HTTPException):
+    """Raised from ``receive`` once a streamed body passes the limit"""
+
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body exceeds {limit} bytes")
+
+
+class BodySizeLimitMiddleware:
+    """Rejects request bodies over a per-path byte limit with 413 before they are read in full.
+
+    A declared Content-Length is checked before the app runs; chunked bodies
+    are counted as they are received.
+    """
+
+    def __init__(self, app, default_limit: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self.path_limits.get(scope["path"], self.default_limit)
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            await self._reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise PayloadTooLarge(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except PayloadTooLarge:
+            if started:
+                raise
+            await self._reject(scope, receive, send, limit)
+
+    async def _reject(self, scope, receive, send, limit: int):
+        response = JSONResponse(status_code=413, content={"detail": f"Request body exceeds {limit} bytes"},
+                                headers={"Connection": "close"})
+        await response(scope, receive, send)
+
@@ -0,0 +1,82 @@
+"""Load test for the async LLM path of /chat.
+
+Replaces the Groq client with a stand-in that takes ``--latency`` seconds per
+call and fires ``--concurrency`` first-turn consultations (which always hit
+the LLM) at the app in-process. The "blocking" mode reproduces the old
+behaviour of calling a synchronous client from the event loop.
+
+    python benchmarks/bench_async_llm.py --concurrency 200 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+# Every consultation sends the same first turn; cached replies would skip the LLM
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+# All simulated users share one client address and fire at once
+os.environ.setdefault("IP_RATE_PER_MINUTE", "0")
+os.environ.setdefault("SESSION_RATE_PER_MINUTE", "0")
+os.environ.setdefault("LLM_MAX_INFLIGHT", "100000")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import main
+
+
+class FakeReply:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeLLM:
+    """Stand-in for ChatGroq with a fixed per-call latency"""
+
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+
+    async def ainvoke(self, messages):
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return FakeReply("Namaste! Please tell me about your concern.")
+
+
+async def run(concurrency: int, latency: float, blocking: bool) -> float:
+    main.llm_client.primary = FakeLLM(latency, blocking)
+    main.GROQ_AVAILABLE = True
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def consult(i: int):
+            response = await client.post("/chat", json={
+                "messages": [{"role": "user", "content": "Namaste"}],
+                "session_id": f"bench_{blocking}_{i}",
+                "seq": 0
+            })
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(consult(i) for i in range(concurrency)))
+        return time.perf_counter() - started
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for blocking in (True, False):
+        elapsed = asyncio.run(run(args.concurrency, args.latency, blocking))
+        mode = "blocking" if blocking else "async"
+        print(f"{mode:>9}: {args.concurrency} requests in {elapsed:.2f}s "
+              f"({args.concurrency / elapsed:.1f} req/s)")
+
+
+if __name__ == "__main__":
+    main_cli()
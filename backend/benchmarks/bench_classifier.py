@@ -0,0 +1,98 @@
+"""Micro-benchmark: the keyword classifier vs. the previous substring scans.
+
+The previous implementation lowercased every answer and ran nested
+``any(word in answer for word in [...])`` substring scans per label. The
+classifier makes one regex pass per answer, matches whole words and counts
+every hit for its confidence scores. CPython's C substring search with
+early exit stays faster, so this measures what that costs rather than a
+speedup.
+
+    python benchmarks/bench_classifier.py --words 20,200,2000 --number 200
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classifier import classify_answers
+
+FILLER = ("I have been thinking about this situation and talking to people around me "
+          "but nothing seems to change and every day feels the same as before").split()
+
+
+def legacy_classify(answers):
+    """The analysis-stage classification as it was before the classifier module"""
+    user_answers = [answer.lower() for answer in answers]
+
+    problem_type = "general"
+    if any(word in user_answers[0] for word in ["career", "job", "work", "business"]):
+        problem_type = "career"
+    elif any(word in user_answers[0] for word in ["relationship", "marriage", "love", "partner", "family"]):
+        problem_type = "relationship"
+    elif any(word in user_answers[0] for word in ["financial", "money", "wealth", "income", "debt"]):
+        problem_type = "financial"
+    elif any(word in user_answers[0] for word in ["health", "sick", "disease", "pain", "medical"]):
+        problem_type = "health"
+
+    duration = "medium"
+    if len(user_answers) > 2:
+        if any(word in user_answers[2] for word in ["days", "week", "recent"]):
+            duration = "recent"
+        elif any(word in user_answers[2] for word in ["months", "year", "long"]):
+            duration = "long"
+
+    impact = "general"
+    if len(user_answers) > 3:
+        if any(word in user_answers[3] for word in ["work", "job", "career"]):
+            impact = "work"
+        elif any(word in user_answers[3] for word in ["relationship", "family", "marriage"]):
+            impact = "relationships"
+        elif any(word in user_answers[3] for word in ["health", "sleep", "physical"]):
+            impact = "health"
+
+    emotions = "stressed"
+    if len(user_answers) > 5:
+        if any(word in user_answers[5] for word in ["angry", "frustrated", "irritated"]):
+            emotions = "angry"
+        elif any(word in user_answers[5] for word in ["sad", "depressed", "hopeless"]):
+            emotions = "sad"
+        elif any(word in user_answers[5] for word in ["anxious", "worried", "fear"]):
+            emotions = "anxious"
+
+    return problem_type, duration, impact, emotions
+
+
+def long_answer(words: int, keyword: str) -> str:
+    rng = random.Random(words)
+    # The keyword sits near the end, the worst case for substring scans
+    body = [rng.choice(FILLER) for _ in range(words)]
+    body.insert(int(words * 0.9), keyword)
+    return " ".join(body)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", default="20,200,2000", help="comma-separated words per answer")
+    parser.add_argument("--number", type=int, default=200, help="iterations per implementation")
+    args = parser.parse_args()
+
+    cases = {
+        "keywords near the end": ["finances and debt", "hello", "several months", "my sleep", "puja", "I feel worried", "headaches"],
+        "no keywords": ["hello"] * 7,
+    }
+    for words in [int(words) for words in args.words.split(",")]:
+        for case, keywords in cases.items():
+            answers = [long_answer(words, keyword) for keyword in keywords]
+            assert legacy_classify(answers) == classify_answers(answers).key
+
+            print(f"{case} ({words} words per answer):")
+            for name, func in (("legacy substring scans", legacy_classify), ("single-pass classifier", classify_answers)):
+                seconds = timeit.timeit(lambda: func(answers), number=args.number)
+                print(f"  {name:>22}: {seconds / args.number * 1e6:9.1f} us per consultation")
+
+
+if __name__ == "__main__":
+    main_cli()
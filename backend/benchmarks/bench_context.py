@@ -0,0 +1,84 @@
+"""Prompt size report: token-budgeted context builder vs. fixed last-10 window.
+
+Simulates consultations with short and long user answers through greeting,
+question_1..5, analysis and several ongoing turns, and reports the prompt
+token distribution of every LLM call (greeting and ongoing stages) under the
+previous ``messages[-10:]`` window and under build_llm_messages.
+
+    python benchmarks/bench_context.py --consultations 500 --ongoing 6
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from message_log import ASSISTANT
+
+VOCABULARY = ("my career has been stuck and my manager does not value my work so I feel anxious "
+              "every morning and cannot sleep well because of the pressure at home and office").split()
+
+
+def answer(rng: random.Random) -> str:
+    # Mostly short answers with a long tail of very long ones
+    words = rng.choice([rng.randint(3, 20)] * 3 + [rng.randint(150, 800)])
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def prompt_tokens(langchain_messages) -> int:
+    return sum(main.token_counter(content) for _, content in langchain_messages)
+
+
+def legacy_prompt_tokens(messages, stage) -> int:
+    """Prompt size of the previous builder: system prompt + last 10 messages + hint"""
+    tokens = main.token_counter(main.SYSTEM_PROMPT)
+    for msg in messages[-10:]:
+        tokens += main.token_counter(msg.content)
+    return tokens + main.token_counter("Continue the conversation naturally, providing guidance and support.")
+
+
+def percentiles(values):
+    values = sorted(values)
+    pick = lambda q: values[min(int(q * len(values)), len(values) - 1)]
+    return f"p50={pick(0.5):6d}  p95={pick(0.95):6d}  max={values[-1]:6d}  mean={sum(values) / len(values):8.1f}"
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--consultations", type=int, default=500)
+    parser.add_argument("--ongoing", type=int, default=6, help="ongoing turns after the analysis")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    legacy, budgeted = [], []
+    build_seconds = 0.0
+    for _ in range(args.consultations):
+        state = main.AstrologyState()
+        for _turn in range(7 + args.ongoing):
+            state.add_user_turn(answer(rng))
+            stage = main.determine_stage(state.messages)
+            if stage in ("greeting", "ongoing"):
+                legacy.append(legacy_prompt_tokens(state.messages, stage))
+                started = time.perf_counter()
+                langchain_messages = main.build_llm_messages(state.messages, stage, state.summary)
+                build_seconds += time.perf_counter() - started
+                budgeted.append(prompt_tokens(langchain_messages))
+                reply = answer(rng)
+            else:
+                reply = main.get_fallback_response(stage, "", state.messages)
+            state.messages.append(ASSISTANT, reply)
+
+    print(f"LLM calls: {len(legacy)}  (history budget {main.Config.CONTEXT_TOKEN_BUDGET} tokens, "
+          f"of which up to {main.Config.SUMMARY_TOKEN_BUDGET} for the summary)")
+    print(f"  messages[-10:]   {percentiles(legacy)}")
+    print(f"  context builder  {percentiles(budgeted)}")
+    print(f"  builder time: {build_seconds / len(budgeted) * 1e6:.1f} us per call")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,148 @@
+"""Per-request CPU time of the GET endpoints and the /chat response path.
+
+Calls the ASGI app directly (no HTTP client or server in the measurement)
+and compares the pre-serialized orjson responses against routes that
+rebuild their payload and go through FastAPI's default serialization, as
+the endpoints did before. The /chat case replays a stored turn, so only
+admission, session lookup and response building are timed, the same on
+both sides.
+
+    python benchmarks/bench_responses.py --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Thousands of requests from one client: keep the admission limits out of the way
+os.environ.setdefault("IP_RATE_PER_MINUTE", "0")
+os.environ.setdefault("SESSION_RATE_PER_MINUTE", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Request
+
+import main
+
+
+# The endpoints as they were before responses were pre-serialized
+@main.app.get("/legacy/")
+async def legacy_root():
+    return {
+        "message": "Welcome to Pandit Pradeep Kiradoo's Astrology API",
+        "version": "2.0.0",
+        "features": ["problem_understanding", "astrological_remedies", "planetary_analysis"],
+        "groq_available": main.groq_available(),
+        "llm_circuit": main.llm_client.breaker.state
+    }
+
+
+@main.app.get("/legacy/health")
+async def legacy_health():
+    return {
+        "status": "healthy" if main.groq_available() or not main.GROQ_AVAILABLE else "degraded",
+        "service": "astrology_chatbot_v2",
+        "worker_pid": os.getpid(),
+        "cold_start_seconds": round(main.metrics.COLD_START.value, 3),
+        "slim_mode": main.Config.SLIM_MODE,
+        "groq_available": main.groq_available(),
+        "llm": main.llm_client.status(),
+        "ttft": main.ttft_summary(),
+        "response_cache": main.response_cache.stats() if main.response_cache is not None else None
+    }
+
+
+# Same admission, locking and logging as /chat, so only response building differs
+@main.app.post("/legacy/chat", response_model=main.ChatResponse)
+async def legacy_chat(request: main.ChatRequest, http_request: Request):
+    started = time.perf_counter()
+    slot = lease = None
+    try:
+        main.admit_request(http_request, request.session_id)
+        key = main.idempotency_key(http_request)
+        lease = await main.lock_session(request, key)
+        state, _, slot = main.open_turn(request, key)
+        elapsed = time.perf_counter() - started
+        main.metrics.STAGE_LATENCY.observe(elapsed, endpoint="chat", stage=state.current_stage)
+        main.logger.info("Chat turn handled", stage=state.current_stage, replayed=True, latency_ms=round(elapsed * 1000, 1))
+        data = main.chat_response_data(state, key)
+        return main.ChatResponse(**{**data, "suggestions": list(data["suggestions"])})
+    finally:
+        main.release_turn(slot, lease)
+
+
+async def call(method: str, path: str, body: bytes = b"",
+               headers: Optional[List[Tuple[bytes, bytes]]] = None) -> Tuple[int, Dict[bytes, bytes], bytes]:
+    """Drive one request through the ASGI app"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + (headers or []),
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status, response_headers, chunks = 0, {}, []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await main.app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
+
+
+async def cpu_per_request(requests: int, method: str, path: str, body: bytes = b"",
+                          headers: Optional[List[Tuple[bytes, bytes]]] = None) -> float:
+    for _ in range(min(requests, 200)):
+        await call(method, path, body, headers)
+    started = time.process_time()
+    for _ in range(requests):
+        status, _, _ = await call(method, path, body, headers)
+    elapsed = time.process_time() - started
+    assert status in (200, 304), f"{method} {path} returned {status}"
+    return elapsed / requests * 1e6
+
+
+async def run(requests: int) -> Dict[str, Tuple[float, float]]:
+    main.GROQ_AVAILABLE = False
+    _, _, reply = await call("POST", "/chat", json.dumps({"messages": [{"role": "user", "content": "Namaste"}], "seq": 0}).encode())
+    reply = json.loads(reply)
+    replay = json.dumps({"messages": [], "session_id": reply["session_id"], "seq": reply["seq"],
+                         "history_hash": reply["history_hash"]}).encode()
+    _, health_headers, _ = await call("GET", "/health")
+    etag = [(b"if-none-match", health_headers[b"etag"])]
+
+    results = {}
+    for label, new, legacy in [
+        ("GET /", ("GET", "/"), ("GET", "/legacy/")),
+        ("GET /health", ("GET", "/health"), ("GET", "/legacy/health")),
+        ("POST /chat (replay)", ("POST", "/chat", replay), ("POST", "/legacy/chat", replay)),
+    ]:
+        results[label] = (await cpu_per_request(requests, *legacy), await cpu_per_request(requests, *new))
+    results["GET /health (304)"] = (results["GET /health"][0], await cpu_per_request(requests, "GET", "/health", b"", etag))
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    results = asyncio.run(run(args.requests))
+    print(f"{'endpoint':<22} {'before us':>10} {'after us':>10} {'saved':>7}")
+    for label, (before, after) in results.items():
+        print(f"{label:<22} {before:10.1f} {after:10.1f} {1 - after / before:7.0%}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,99 @@
+"""Throughput scaling of the multi-worker deployment.
+
+Starts the fake Groq server and ``uvicorn main:app --workers N`` with the
+shared SQLite session store for each worker count, then drives full
+consultations from several client processes for ``--duration`` seconds.
+Turns of a consultation land on whichever worker accepts the connection,
+so any failed consultation means session state was not shared.
+
+    python benchmarks/bench_scaling.py --workers 1,2,4 --clients 4 --duration 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import consult, free_port, start_api, start_fake_groq, stop_process
+
+
+async def drive(base_url: str, concurrency: int, duration: float, client_id: int) -> Tuple[int, int]:
+    latencies: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    stop_at = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        async def loop(slot: int):
+            run = 0
+            while time.monotonic() < stop_at:
+                await consult(client, f"scale_{os.getpid()}_{client_id}_{slot}_{run}", "/chat", latencies, errors)
+                run += 1
+
+        await asyncio.gather(*(loop(slot) for slot in range(concurrency)))
+    return sum(len(samples) for samples in latencies.values()), len(errors)
+
+
+def client_process(job: Tuple[str, int, float, int]) -> Tuple[int, int]:
+    return asyncio.run(drive(*job))
+
+
+def measure(workers: int, args) -> Tuple[float, int]:
+    fake_port, api_port = free_port(), free_port()
+    fake = start_fake_groq(fake_port, args)
+    api = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            api = start_api(api_port, fake_port, workers=workers, env={
+                "SESSION_BACKEND": "sqlite",
+                "SESSION_DB_PATH": os.path.join(tmp, "sessions.db"),
+                "WEB_CONCURRENCY": str(workers),
+            })
+            base_url = f"http://127.0.0.1:{api_port}"
+            jobs = [(base_url, args.concurrency, args.duration, i) for i in range(args.clients)]
+            started = time.perf_counter()
+            with multiprocessing.Pool(args.clients) as pool:
+                results = pool.map(client_process, jobs)
+            elapsed = time.perf_counter() - started
+            stop_process(api)
+    finally:
+        if api is not None:
+            stop_process(api)
+        stop_process(fake)
+    turns = sum(result[0] for result in results)
+    return turns / elapsed, sum(result[1] for result in results)
+
+
+def main_cli():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=lambda value: [int(v) for v in value.split(",")],
+                        default=[n for n in (1, 2, 4, 8, 16) if n <= cores] or [1],
+                        help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=cores, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="consultations in flight per client process")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Groq time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=5000)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(f"{cores} CPU cores, {args.clients} client processes x {args.concurrency} consultations, "
+          f"{args.duration:.0f}s per run")
+    baseline = None
+    for workers in args.workers:
+        rps, failed = measure(workers, args)
+        baseline = baseline or rps
+        print(f"workers={workers:<3} {rps:8.1f} req/s  speedup {rps / baseline:5.2f}x  "
+              f"(ideal {workers}x)  failed consultations: {failed}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,85 @@
+"""Memory benchmark for session message history.
+
+Builds ``--sessions`` completed 7-turn consultations twice: once with the
+previous representation (a dict per message holding an ISO timestamp string)
+and once with AstrologyState's MessageLog, and reports the memory each needs.
+
+    python benchmarks/bench_session_memory.py --sessions 10000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_log import MessageLog, USER, ASSISTANT
+
+USER_TURNS = [
+    "Namaste, I need some guidance",
+    "I have been having problems in my career and my job feels stuck",
+    "It has been going on for several months now",
+    "It affects my work performance and my sleep",
+    "I have tried meditation and changing my routine",
+    "I feel stressed and anxious most of the time",
+    "I keep having arguments at work and cannot concentrate",
+]
+REPLY = "Thank you for sharing. **How long have you been facing this issue?**"
+
+
+def rss_kib() -> int:
+    """Resident set size of this process in KiB (Linux only, 0 elsewhere)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return 0
+
+
+def dict_history(session: int):
+    messages = []
+    for turn in USER_TURNS:
+        # Unique per session, like real user input
+        messages.append({"role": "user", "content": f"{turn} ({session})", "timestamp": datetime.now().isoformat()})
+        messages.append({"role": "assistant", "content": REPLY, "timestamp": datetime.now().isoformat()})
+    return messages
+
+
+def log_history(session: int):
+    log = MessageLog()
+    for turn in USER_TURNS:
+        log.append(USER, f"{turn} ({session})")
+        log.append(ASSISTANT, REPLY)
+    return log
+
+
+def measure(build, sessions: int):
+    gc.collect()
+    rss_before = rss_kib()
+    tracemalloc.start()
+    histories = [build(i) for i in range(sessions)]
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = rss_kib()
+    del histories
+    gc.collect()
+    return traced, rss_after - rss_before
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    args = parser.parse_args()
+
+    for name, build in (("dict per message", dict_history), ("MessageLog", log_history)):
+        traced, rss = measure(build, args.sessions)
+        print(f"{name:>17}: {traced / 1024 / 1024:7.2f} MiB allocated, "
+              f"RSS +{rss / 1024:7.2f} MiB for {args.sessions} sessions "
+              f"({traced / args.sessions:.0f} B/session)")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,98 @@
+"""Cold-start time and import-time breakdown of the backend.
+
+For the default (lazy Groq client), slim and eagerly initialized setups,
+reports the time to import ``main``, the heaviest top-level packages from
+``python -X importtime`` and the time from launching uvicorn until the first
+successful ``/health`` response.
+
+    python benchmarks/bench_startup.py --runs 5 --top 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import BACKEND_DIR, free_port, stop_process
+
+MODES = {
+    "lazy": ({}, "import main"),
+    "slim": ({"SLIM_MODE": "true"}, "import main"),
+    "eager": ({}, "import main; main.load_chat_models()"),
+}
+
+
+def mode_env(overrides: Dict[str, str]) -> Dict[str, str]:
+    return {**os.environ, "GROQ_API_KEY": "startup-bench", "LOG_LEVEL": "WARNING", **overrides}
+
+
+def import_breakdown(overrides: Dict[str, str], code: str) -> Tuple[float, Dict[str, float]]:
+    """Total import time and self time per top-level package, in seconds"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR,
+                            env=mode_env(overrides), capture_output=True, text=True, check=True)
+    packages: Dict[str, float] = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+        # Nested imports are indented below the module that triggered them
+        if not name[1:].startswith(" "):
+            total += int(cumulative_us) / 1e6
+    return total, packages
+
+
+def time_to_health(overrides: Dict[str, str]) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    api = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                            "--log-level", "warning"], cwd=BACKEND_DIR, env=mode_env(overrides),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if api.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                time.sleep(0.01)
+    finally:
+        stop_process(api)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="packages listed per mode")
+    parser.add_argument("--modes", default="lazy,slim,eager")
+    args = parser.parse_args()
+
+    for mode in args.modes.split(","):
+        overrides, code = MODES[mode]
+        totals: List[float] = []
+        packages: Dict[str, List[float]] = {}
+        for _ in range(args.runs):
+            total, breakdown = import_breakdown(overrides, code)
+            totals.append(total)
+            for package, seconds in breakdown.items():
+                packages.setdefault(package, []).append(seconds)
+        print(f"\n{mode}: import {statistics.median(totals) * 1000:.0f} ms (median of {args.runs})")
+        ranked = sorted(((statistics.median(samples), package) for package, samples in packages.items()), reverse=True)
+        for seconds, package in ranked[:args.top]:
+            print(f"  {package:<24} {seconds * 1000:8.1f} ms")
+        if mode != "eager":
+            cold_starts = [time_to_health(overrides) for _ in range(args.runs)]
+            print(f"  launch to first /health: {statistics.median(cold_starts) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,113 @@
+"""Local stand-in for the Groq chat completions API.
+
+Serves ``POST /openai/v1/chat/completions`` (plain and streaming) with a
+configurable time to first token, token rate and injected error rate, so the
+backend can be load tested without a real GROQ_API_KEY or quota.
+
+    python benchmarks/fake_groq.py --port 9100 --latency 0.3 --tokens-per-second 500 --error-rate 0.02
+
+Point the backend at it with ``GROQ_API_BASE=http://127.0.0.1:9100``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Behaviour is read from the environment so the app can also be started with
+# ``uvicorn fake_groq:app``
+settings = {
+    "latency": float(os.getenv("FAKE_GROQ_LATENCY", "0.3")),
+    "tokens_per_second": float(os.getenv("FAKE_GROQ_TOKENS_PER_SECOND", "500")),
+    "reply_tokens": int(os.getenv("FAKE_GROQ_REPLY_TOKENS", "150")),
+    "error_rate": float(os.getenv("FAKE_GROQ_ERROR_RATE", "0")),
+}
+
+WORDS = ("Namaste, the planets indicate a period of patience. Chant the Gayatri Mantra daily, "
+         "offer water to the Sun at sunrise and keep faith; Shani's obstacles will ease.").split()
+
+app = FastAPI(title="Fake Groq API")
+stats = {"requests": 0, "errors": 0}
+
+
+def reply_tokens(count: int):
+    return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+def completion_id() -> str:
+    return f"chatcmpl-{uuid.uuid4().hex}"
+
+
+def injected_error():
+    stats["errors"] += 1
+    status = random.choice([429, 500, 503])
+    return JSONResponse(status_code=status, content={"error": {"message": "injected failure", "type": "fake_error"}})
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    await asyncio.sleep(settings["latency"])
+    if random.random() < settings["error_rate"]:
+        return injected_error()
+
+    model = body.get("model", "fake-model")
+    tokens = reply_tokens(min(settings["reply_tokens"], body.get("max_tokens") or settings["reply_tokens"]))
+    prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in body.get("messages", []))
+    created = int(time.time())
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+
+    if not body.get("stream"):
+        await asyncio.sleep(len(tokens) / settings["tokens_per_second"])
+        return {
+            "id": completion_id(), "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    chunk_id = completion_id()
+
+    async def events():
+        for token in tokens:
+            chunk = {"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(1 / settings["tokens_per_second"])
+        final = {"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=settings["latency"], help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=settings["tokens_per_second"])
+    parser.add_argument("--reply-tokens", type=int, default=settings["reply_tokens"])
+    parser.add_argument("--error-rate", type=float, default=settings["error_rate"], help="fraction of calls that fail")
+    args = parser.parse_args()
+
+    settings.update(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                    reply_tokens=args.reply_tokens, error_rate=args.error_rate)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main_cli()
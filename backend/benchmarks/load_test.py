@@ -0,0 +1,225 @@
+"""End-to-end load test of the backend against a local fake Groq server.
+
+Starts ``benchmarks/fake_groq.py`` and the API (``uvicorn main:app``) as
+subprocesses, then drives full consultations (greeting, question_1..5,
+analysis, ongoing) over HTTP at increasing concurrency and reports
+throughput, latency percentiles per stage and resident memory per session.
+
+    python benchmarks/load_test.py --concurrency 10,50,100 --latency 0.3 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One scripted consultation: each user turn advances the stage by one
+CONSULTATION = [
+    "Namaste Panditji",
+    "I am worried about my career, there is no growth at my job",
+    "Born 12 March 1992, 6:45 AM in Jaipur",
+    "It has been going on for about two years",
+    "It affects my confidence and my finances",
+    "I have tried changing jobs but nothing worked",
+    "I feel anxious and frustrated most days",
+    "Thank you, how long should I follow these remedies?",
+]
+STAGES = ["greeting", "question_1", "question_2", "question_3", "question_4", "question_5", "analysis", "ongoing"]
+
+_METRIC_LINE = re.compile(r"^(\w+) ([0-9.e+-]+)$", re.M)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(args, cwd=BACKEND_DIR, env={**os.environ, **env},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited early:\n{process.stderr.read().decode(errors='replace')}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop_process(process: subprocess.Popen):
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def read_gauges(client: httpx.AsyncClient) -> Dict[str, float]:
+    response = await client.get("/metrics")
+    return {name: float(value) for name, value in _METRIC_LINE.findall(response.text)}
+
+
+async def consult(client: httpx.AsyncClient, name: str, endpoint: str,
+                  latencies: Dict[str, List[float]], errors: List[str]):
+    session_id: Optional[str] = None
+    seq, history_hash = 0, None
+    for turn, content in enumerate(CONSULTATION):
+        body = {"messages": [{"role": "user", "content": content}], "session_id": session_id or name,
+                "seq": seq, "history_hash": history_hash}
+        started = time.perf_counter()
+        try:
+            if endpoint == "/chat/stream":
+                async with client.stream("POST", endpoint, json=body) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if line.startswith("data: ") and '"session_id"' in line:
+                            data = json.loads(line[6:])
+                            seq, history_hash, session_id = data["seq"], data["history_hash"], data["session_id"]
+            else:
+                response = await client.post(endpoint, json=body)
+                response.raise_for_status()
+                data = response.json()
+                seq, history_hash, session_id = data["seq"], data["history_hash"], data["session_id"]
+        except httpx.HTTPError as e:
+            errors.append(f"{STAGES[turn]}: {type(e).__name__}")
+            return
+        latencies.setdefault(STAGES[turn], []).append(time.perf_counter() - started)
+
+
+async def run_level(base_url: str, concurrency: int, rounds: int, endpoint: str, level: int) -> Dict[str, object]:
+    latencies: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        before = await read_gauges(client)
+        started = time.perf_counter()
+        for batch in range(rounds):
+            await asyncio.gather(*(consult(client, f"load_{level}_{batch}_{i}", endpoint, latencies, errors)
+                                   for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        after = await read_gauges(client)
+
+    all_latencies = [sample for samples in latencies.values() for sample in samples]
+    new_sessions = after.get("sessions_active", 0) - before.get("sessions_active", 0)
+    rss_delta = after.get("process_resident_memory_bytes", 0) - before.get("process_resident_memory_bytes", 0)
+    return {
+        "concurrency": concurrency,
+        "requests": len(all_latencies),
+        "errors": errors,
+        "rps": len(all_latencies) / elapsed if elapsed else 0.0,
+        "overall": all_latencies,
+        "stages": latencies,
+        "bytes_per_session": rss_delta / new_sessions if new_sessions > 0 else 0.0,
+        "sessions": after.get("sessions_active", 0),
+    }
+
+
+async def warm_up(base_url: str, endpoint: str):
+    """Run one untimed consultation so one-time costs, such as the Groq client
+    and its LangChain import on the first LLM turn, don't land in the first level"""
+    errors: List[str] = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        await consult(client, "load_warmup", endpoint, {}, errors)
+    if errors:
+        raise RuntimeError(f"warm-up consultation failed: {errors}")
+
+
+def report(result: Dict[str, object]):
+    print(f"\nconcurrency {result['concurrency']}: {result['requests']} turns, {result['rps']:.1f} req/s, "
+          f"{len(result['errors'])} failed consultations, {result['sessions']:.0f} sessions held, "
+          f"~{result['bytes_per_session'] / 1024:.1f} KiB RSS per new session")
+    print(f"  {'stage':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = [(stage, result["stages"].get(stage, [])) for stage in STAGES] + [("all", result["overall"])]
+    for stage, samples in rows:
+        if samples:
+            print(f"  {stage:<12} " + " ".join(f"{percentile(samples, q) * 1000:9.1f}" for q in (0.5, 0.95, 0.99)))
+
+
+def start_fake_groq(port: int, args) -> subprocess.Popen:
+    fake = start_process([sys.executable, "benchmarks/fake_groq.py", "--port", str(port),
+                          "--latency", str(args.latency), "--tokens-per-second", str(args.tokens_per_second),
+                          "--reply-tokens", str(args.reply_tokens), "--error-rate", str(args.error_rate)], {})
+    wait_until_up(f"http://127.0.0.1:{port}/stats", fake)
+    return fake
+
+
+def start_api(port: int, fake_port: int, workers: int = 1, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    api = start_process([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                         "--workers", str(workers), "--log-level", "warning", "--no-access-log"], {
+        "GROQ_API_KEY": "fake-groq-key",
+        "GROQ_API_BASE": f"http://127.0.0.1:{fake_port}",
+        "RESPONSE_CACHE_ENABLED": os.environ.get("RESPONSE_CACHE_ENABLED", "false"),
+        "LOG_LEVEL": "WARNING",
+        # Every simulated user comes from 127.0.0.1 and sends turns back to back
+        "IP_RATE_PER_MINUTE": "0",
+        "SESSION_RATE_PER_MINUTE": "0",
+        "LLM_MAX_INFLIGHT": os.environ.get("LLM_MAX_INFLIGHT", "100000"),
+        **(env or {}),
+    })
+    wait_until_up(f"http://127.0.0.1:{port}/health", api)
+    return api
+
+
+async def run(args) -> List[Dict[str, object]]:
+    fake_port, api_port = free_port(), free_port()
+    fake = start_fake_groq(fake_port, args)
+    api = None
+    try:
+        api = start_api(api_port, fake_port)
+        base_url = f"http://127.0.0.1:{api_port}"
+        await warm_up(base_url, args.endpoint)
+        results = []
+        for level, concurrency in enumerate(args.concurrency):
+            result = await run_level(base_url, concurrency, args.rounds, args.endpoint, level)
+            report(result)
+            results.append(result)
+        return results
+    finally:
+        if api is not None:
+            stop_process(api)
+        stop_process(fake)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=lambda value: [int(v) for v in value.split(",")], default=[10, 50, 100],
+                        help="comma-separated concurrent consultations per level")
+    parser.add_argument("--rounds", type=int, default=1, help="consultation batches per level")
+    parser.add_argument("--endpoint", choices=["/chat", "/chat/stream"], default="/chat")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--reply-tokens", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    print(f"{len(CONSULTATION)}-turn consultations against {args.endpoint}, fake Groq latency {args.latency}s, "
+          f"{args.tokens_per_second:.0f} tok/s, error rate {args.error_rate:.0%}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
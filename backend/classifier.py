@@ -0,0 +1,129 @@
+import re
+from typing import Any, Dict, List, NamedTuple, Pattern, Tuple
+
+# Keyword lists per dimension. Labels are listed in priority order: when an
+# answer mentions several labels, the first one with a hit wins.
+DIMENSIONS: Dict[str, Tuple[str, List[Tuple[str, List[str]]]]] = {
+    "problem_type": ("general", [
+        ("career", ["career", "job", "work", "business"]),
+        ("relationship", ["relationship", "marriage", "love", "partner", "family"]),
+        ("financial", ["financial", "money", "wealth", "income", "debt"]),
+        ("health", ["health", "sick", "disease", "pain", "medical"]),
+    ]),
+    "duration": ("medium", [
+        ("recent", ["days", "week", "recent"]),
+        ("long", ["months", "year", "long"]),
+    ]),
+    "impact": ("general", [
+        ("work", ["work", "job", "career"]),
+        ("relationships", ["relationship", "family", "marriage"]),
+        ("health", ["health", "sleep", "physical"]),
+    ]),
+    "emotions": ("stressed", [
+        ("angry", ["angry", "frustrated", "irritated"]),
+        ("sad", ["sad", "depressed", "hopeless"]),
+        ("anxious", ["anxious", "worried", "fear"]),
+    ]),
+}
+
+# Which user answer (0-based) each dimension is read from in the consultation
+ANSWER_INDEX = {"problem_type": 0, "duration": 2, "impact": 3, "emotions": 5}
+
+
+# Endings a keyword may carry and still count ("years", "working", "sickness")
+SUFFIXES = ("s", "es", "ed", "ing", "ness")
+
+
+def _alternation(words: List[str]) -> str:
+    """Regex source matching any of ``words``, shaped as a trie ("pa(?:in|rtner)")
+    so the engine tries fewer branches at each position"""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def source(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + source(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ending here makes the rest optional
+        return f"(?:{body})?" if "" in node else body
+
+    return source(trie)
+
+
+def _compile(labels: List[Tuple[str, List[str]]]) -> Tuple[Pattern[str], Dict[str, str]]:
+    """One alternation matching any keyword of a dimension, and the label each matched word counts for"""
+    words: Dict[str, str] = {}
+    for label, keywords in labels:
+        for keyword in keywords:
+            for suffix in ("",) + SUFFIXES:
+                # Labels are in priority order, so a word in two labels counts for the first
+                words.setdefault(keyword + suffix, label)
+    keywords = [keyword for _, keywords in labels for keyword in keywords]
+    # No leading \b: a pattern that starts with plain literals lets the regex
+    # engine skip ahead faster, and the word start is checked per hit instead
+    pattern = re.compile(_alternation(keywords) + "(?:" + "|".join(SUFFIXES) + r")?\b")
+    return pattern, words
+
+
+MATCHERS = {dimension: _compile(labels) for dimension, (_, labels) in DIMENSIONS.items()}
+
+
+class Label(NamedTuple):
+    label: str
+    confidence: float
+    scores: Dict[str, int]
+
+
+class Classification(NamedTuple):
+    problem_type: str
+    duration: str
+    impact: str
+    emotions: str
+    confidence: Dict[str, float]
+
+    @property
+    def key(self) -> Tuple[str, str, str, str]:
+        return (self.problem_type, self.duration, self.impact, self.emotions)
+
+
+def classify(text: str, dimension: str) -> Label:
+    """Classify free text along one dimension in a single pass over it.
+
+    Keywords match whole words, optionally with one of ``SUFFIXES``
+    ("work" matches "working" but not "network" or "workshop").
+    ``scores`` counts keyword hits per label and ``confidence`` is the share
+    of all hits that went to the chosen label (0.0 for the default label).
+    """
+    pattern, words = MATCHERS[dimension]
+    text = text.lower()
+    scores: Dict[str, int] = {}
+    for match in pattern.finditer(text):
+        start = match.start()
+        if start and text[start - 1].isalnum():
+            continue
+        label = words[match.group()]
+        scores[label] = scores.get(label, 0) + 1
+    if not scores:
+        return Label(DIMENSIONS[dimension][0], 0.0, scores)
+    # The highest-priority label with a hit wins
+    label = next(label for label, _ in DIMENSIONS[dimension][1] if label in scores)
+    return Label(label, scores[label] / sum(scores.values()), scores)
+
+
+def classify_answers(answers: List[str]) -> Classification:
+    """Classify a consultation from its user answers, one answer per dimension"""
+    labels = {}
+    confidence = {}
+    for dimension, index in ANSWER_INDEX.items():
+        if index < len(answers):
+            result = classify(answers[index], dimension)
+        else:
+            result = Label(DIMENSIONS[dimension][0], 0.0, {})
+        labels[dimension] = result.label
+        confidence[dimension] = result.confidence
+    return Classification(confidence=confidence, **labels)
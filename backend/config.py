@@ -9,23 +9,134 @@ class Config:
     
     # GROQ API Configuration
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    # Override the Groq endpoint (e.g. a local stand-in for load tests)
+    GROQ_API_BASE = os.getenv("GROQ_API_BASE") or None
     
     # Server Configuration
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", "8000"))
+    # Worker processes for `python main.py`; also read by uvicorn and gunicorn
+    WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # Proxies whose X-Forwarded-For is trusted for the client IP (comma-separated, or "*");
+    # the same variable is read by the uvicorn and gunicorn CLIs
+    FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+    
+    # Logging Configuration
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
     
     # CORS Configuration
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "https://astrologer-tawny.vercel.app,https://astrologer-weflys-projects.vercel.app,https://astrologer-git-main-weflys-projects.vercel.app").split(",")
     
+    # Startup Configuration
+    # Serve only the rule-based flow and never import LangChain/Groq
+    SLIM_MODE = os.getenv("SLIM_MODE", "false").lower() == "true"
+    # Build the Groq client in the background right after startup instead of on first use
+    LLM_WARMUP = os.getenv("LLM_WARMUP", "false").lower() == "true"
+    
     # Model Configuration
     MODEL_NAME = os.getenv("MODEL_NAME", "llama-3.1-8b-instant")
     TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
     MAX_TOKENS = int(os.getenv("MAX_TOKENS", "800"))
     
+    # Context Window Configuration (tokens of conversation history per LLM call)
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "200"))
+    
+    # LLM Concurrency Configuration
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "200"))
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+    DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.25"))
+    
+    # LLM Resilience Configuration (LLM_TIMEOUT_SECONDS bounds all attempts together)
+    LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "12"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.25"))
+    LLM_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_MAX_SECONDS", "2"))
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+    # Secondary model raced against slow calls; empty disables hedging
+    HEDGE_MODEL_NAME = os.getenv("HEDGE_MODEL_NAME", "")
+    HEDGE_DELAY_SECONDS = float(os.getenv("HEDGE_DELAY_SECONDS", "2"))
+    
+    # Response Configuration
+    # How long /health reuses its serialized body (breaker changes apply at once)
+    HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "1"))
+    
+    # Streaming Configuration
+    STREAM_CHUNK_WORDS = int(os.getenv("STREAM_CHUNK_WORDS", "3"))
+    
+    # Batch Configuration (/chat/batch and run_batch)
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "32"))
+    BATCH_MAX_TURNS = int(os.getenv("BATCH_MAX_TURNS", "50"))
+    
+    # Admission Control Configuration (enforced per worker; a rate of 0 disables that limiter)
+    MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", "65536"))
+    MAX_BATCH_BODY_BYTES = int(os.getenv("MAX_BATCH_BODY_BYTES", str(16 * 1024 * 1024)))
+    MAX_MESSAGE_CHARS = int(os.getenv("MAX_MESSAGE_CHARS", "4000"))
+    MAX_MESSAGES_PER_REQUEST = int(os.getenv("MAX_MESSAGES_PER_REQUEST", "200"))
+    MAX_SESSION_TURNS = int(os.getenv("MAX_SESSION_TURNS", "100"))
+    SESSION_RATE_PER_MINUTE = float(os.getenv("SESSION_RATE_PER_MINUTE", "20"))
+    SESSION_BURST = int(os.getenv("SESSION_BURST", "5"))
+    IP_RATE_PER_MINUTE = float(os.getenv("IP_RATE_PER_MINUTE", "60"))
+    IP_BURST = int(os.getenv("IP_BURST", "20"))
+    RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # LLM turns admitted at once (running or waiting on LLM_MAX_CONCURRENCY); more get 429
+    LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "400"))
+    LLM_RETRY_AFTER_SECONDS = float(os.getenv("LLM_RETRY_AFTER_SECONDS", "2"))
+    
+    # Session Store Configuration
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # "memory", "sqlite" or "redis"
+    SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+    # How long a SQLite call waits on another worker's write before answering 503;
+    # the event loop is blocked meanwhile, so keep it short
+    SESSION_DB_BUSY_TIMEOUT_SECONDS = float(os.getenv("SESSION_DB_BUSY_TIMEOUT_SECONDS", "0.25"))
+    SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+    # Connect and per-command timeout for Redis; a slow or unreachable server answers 503 instead of stalling the loop
+    SESSION_REDIS_TIMEOUT_SECONDS = float(os.getenv("SESSION_REDIS_TIMEOUT_SECONDS", "0.25"))
+    MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+    SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+    SESSION_SWEEP_SECONDS = float(os.getenv("SESSION_SWEEP_SECONDS", "60"))
+    
+    # Session Concurrency Configuration
+    # How long a turn waits for another turn of the same session before 409
+    SESSION_LOCK_TIMEOUT_SECONDS = float(os.getenv("SESSION_LOCK_TIMEOUT_SECONDS", "35"))
+    IDEMPOTENCY_KEYS_PER_SESSION = int(os.getenv("IDEMPOTENCY_KEYS_PER_SESSION", "16"))
+    
+    # Session Archive Configuration (compaction of finished and idle sessions)
+    ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").lower() == "true"
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "session_archive")
+    ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")  # "zstd" or "gzip"
+    ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "60"))
+    # Idle time before a finished consultation (remedies provided) is archived
+    ARCHIVE_FINISHED_IDLE_SECONDS = float(os.getenv("ARCHIVE_FINISHED_IDLE_SECONDS", "600"))
+    # Idle time before any other session is archived; keep below SESSION_TTL_SECONDS
+    ARCHIVE_IDLE_SECONDS = float(os.getenv("ARCHIVE_IDLE_SECONDS", "3600"))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+    ARCHIVE_SEGMENT_BYTES = int(os.getenv("ARCHIVE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+    
+    # LLM Response Cache Configuration
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+    RESPONSE_CACHE_CONTEXT_MESSAGES = int(os.getenv("RESPONSE_CACHE_CONTEXT_MESSAGES", "2"))
+    # Cosine similarity (0-1) for the similarity tier; 0 disables it
+    RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+    
+    # Content Configuration (questions, suggestions and remedies)
+    CONTENT_PATH = os.getenv("CONTENT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "content.json"))
+    CONTENT_RELOAD_SECONDS = float(os.getenv("CONTENT_RELOAD_SECONDS", "5"))
+    
     @classmethod
     def validate(cls):
         """Validate required configuration"""
-        if not cls.GROQ_API_KEY:
+        if not cls.GROQ_API_KEY and not cls.SLIM_MODE:
             raise ValueError("GROQ_API_KEY is required. Please set it in your .env file.")
+        if cls.WORKERS > 1 and cls.SESSION_BACKEND == "memory":
+            # Each worker would hold its own sessions and lose turns served by the others
+            raise ValueError("WEB_CONCURRENCY > 1 needs a shared SESSION_BACKEND (sqlite or redis).")
+        if cls.ARCHIVE_ENABLED and cls.ARCHIVE_IDLE_SECONDS >= cls.SESSION_TTL_SECONDS:
+            # Sessions would expire from the store before they are archived
+            raise ValueError("ARCHIVE_IDLE_SECONDS must be below SESSION_TTL_SECONDS.")
         
         return True
@@ -0,0 +1,106 @@
+import itertools
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+from classifier import DIMENSIONS
+from config import Config
+from logging_setup import get_logger
+
+logger = get_logger("content")
+
+DIMENSION_NAMES = tuple(DIMENSIONS)
+
+
+class Content:
+    """Consultation text loaded from the content file.
+
+    Remedy rules are matched in order (first match wins) and expanded at load
+    time into an index keyed by every possible classification tuple, so a
+    remedy lookup is a single dict access.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.questions: Dict[str, str] = data["questions"]
+        self.suggestions: Dict[str, List[str]] = data["suggestions"]
+        self.fallback_responses: Dict[str, List[str]] = data["fallback_responses"]
+        self.remedies: Dict[str, str] = data["remedies"]
+        self.remedy_index = self._build_remedy_index(data["remedy_rules"])
+        # Quick replies shown per stage, sliced once instead of on every response
+        self._stage_suggestions = {stage: choices[:4] for stage, choices in self.suggestions.items()}
+
+        for stage in ("greeting", "ongoing"):
+            if not self.fallback_responses.get(stage):
+                raise ValueError(f"fallback_responses.{stage} must not be empty")
+        if "ongoing" not in self.suggestions:
+            raise ValueError("suggestions.ongoing is required")
+
+    def _build_remedy_index(self, rules: List[Dict[str, Any]]) -> Dict[Tuple[str, ...], str]:
+        for rule in rules:
+            if rule["remedy"] not in self.remedies:
+                raise ValueError(f"Remedy rule refers to unknown remedy {rule['remedy']!r}")
+            for dimension in rule["when"]:
+                if dimension not in DIMENSIONS:
+                    raise ValueError(f"Remedy rule uses unknown dimension {dimension!r}")
+
+        labels = [[default] + [label for label, _ in choices] for default, choices in DIMENSIONS.values()]
+        index = {}
+        for key in itertools.product(*labels):
+            classification = dict(zip(DIMENSION_NAMES, key))
+            for rule in rules:
+                if all(classification[dimension] == label for dimension, label in rule["when"].items()):
+                    index[key] = self.remedies[rule["remedy"]]
+                    break
+            else:
+                raise ValueError(f"No remedy rule matches {classification}")
+        return index
+
+    def remedy_for(self, key: Tuple[str, ...]) -> str:
+        return self.remedy_index[key]
+
+    def suggestions_for(self, stage: str) -> List[str]:
+        """Shared list for ``stage``; callers must not modify it"""
+        return self._stage_suggestions.get(stage, self._stage_suggestions["ongoing"])
+
+
+class ContentStore:
+    """Loads the content file once and reloads it when it changes on disk.
+
+    The file's modification time is checked at most every
+    ``Config.CONTENT_RELOAD_SECONDS``, so every worker picks up edits without
+    a restart. An edit that fails to load keeps the previous content.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = os.path.getmtime(path)
+        self._content = self._load()
+        self._checked_at = time.monotonic()
+
+    def _load(self) -> Content:
+        with open(self.path, encoding="utf-8") as handle:
+            return Content(json.load(handle))
+
+    def current(self) -> Content:
+        now = time.monotonic()
+        if now - self._checked_at >= Config.CONTENT_RELOAD_SECONDS:
+            self._checked_at = now
+            self.reload_if_changed()
+        return self._content
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return False
+            # Remember the version even if it fails, so a bad edit is
+            # reported once rather than on every check
+            self._mtime = mtime
+            self._content = self._load()
+        except Exception as e:
+            # Any malformed edit (wrong types as well as bad JSON) keeps the previous content
+            logger.warning("Could not reload content, keeping previous version", path=self.path, error=str(e))
+            return False
+        logger.info("Reloaded content", path=self.path)
+        return True
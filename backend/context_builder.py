@@ -0,0 +1,102 @@
+import re
+from typing import Any, Dict, List, Tuple
+
+from message_log import Message, MessageLog
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+_MARKDOWN = re.compile(r"[*_#>`]+")
+
+
+class TokenCounter:
+    """Approximates token counts locally.
+
+    Words and punctuation marks count as one token each and long words as one
+    token per four characters, which tracks BPE tokenizers closely enough for
+    budgeting. The Groq models don't publish a tokenizer, so an exact count
+    isn't available anyway.
+    """
+
+    def __call__(self, text: str) -> int:
+        return sum(1 + (len(token) - 1) // 4 for token in _TOKEN.findall(text))
+
+
+class RollingSummary:
+    """Summary of the turns that no longer fit in the context window.
+
+    ``upto`` is the number of leading messages already folded into ``text``;
+    the window only ever moves forward, so each turn is summarized once.
+    """
+
+    __slots__ = ("text", "upto")
+
+    def __init__(self, text: str = "", upto: int = 0):
+        self.text = text
+        self.upto = upto
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"text": self.text, "upto": self.upto}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RollingSummary":
+        return cls(data["text"], data["upto"])
+
+
+def summarize_message(message: Message, counter: TokenCounter, max_tokens: int) -> str:
+    """One-line extractive summary: the first sentence, trimmed to ``max_tokens``"""
+    text = " ".join(_MARKDOWN.sub("", message.content).split())
+    sentence = _SENTENCE_END.split(text, 1)[0]
+    words = sentence.split()
+    while len(words) > 1 and counter(" ".join(words)) > max_tokens:
+        words = words[:max(1, len(words) * 3 // 4)]
+    speaker = "User" if message.role == "user" else "Pandit"
+    return f"{speaker}: {' '.join(words)}"
+
+
+def fold_into_summary(summary: RollingSummary, lines: List[str], counter: TokenCounter, budget: int):
+    """Append summary lines, dropping the oldest (but never the first) to fit ``budget``"""
+    kept = summary.text.split("\n") if summary.text else []
+    kept.extend(lines)
+    while len(kept) > 2 and counter("\n".join(kept)) > budget:
+        # The first line is the user's original concern; keep it
+        del kept[1]
+    summary.text = "\n".join(kept)
+
+
+def _window_start(messages: MessageLog, lower: int, counter: TokenCounter, available: int) -> int:
+    # Walk back from the newest message; the newest one is always included
+    start = len(messages)
+    used = 0
+    while start > lower:
+        tokens = messages.token_count(start - 1, counter)
+        if used + tokens > available and start < len(messages):
+            break
+        used += tokens
+        start -= 1
+    return start
+
+
+def build_context(messages: MessageLog, summary: RollingSummary, counter: TokenCounter,
+                  budget: int, summary_budget: int) -> Tuple[str, List[Message]]:
+    """Pick the newest messages that fit in ``budget`` tokens.
+
+    Messages that fall out of the window are folded into ``summary`` (updated
+    in place), which takes up to ``summary_budget`` tokens of the budget.
+    Token counts are cached on the message log. Returns the summary text and
+    the window, oldest first.
+    """
+    if summary.upto:
+        start = _window_start(messages, summary.upto, counter, budget - summary_budget)
+    else:
+        start = _window_start(messages, 0, counter, budget)
+        if start > 0:
+            # Older turns need a summary; make room for it
+            start = _window_start(messages, 0, counter, budget - summary_budget)
+
+    if start > summary.upto:
+        per_line = max(summary_budget // 4, 16)
+        lines = [summarize_message(messages[i], counter, per_line) for i in range(summary.upto, start)]
+        fold_into_summary(summary, lines, counter, summary_budget)
+        summary.upto = start
+
+    return summary.text, messages[start:]
@@ -0,0 +1,270 @@
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import metrics
+from logging_setup import get_logger
+
+logger = get_logger("llm")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Gauge values for the breaker state
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class LLMUnavailableError(Exception):
+    """Raised instead of calling the LLM when it cannot be used right now"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised instead of calling the LLM while the circuit breaker is open"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection errors, rate limits and 5xx are worth retrying; other 4xx are not"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return True
+    return status in (408, 409, 429) or status >= 500
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Opens after ``failure_threshold`` failures in a row. While open every call
+    is rejected at once; after ``reset_seconds`` a single probe call is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info("LLM circuit closed")
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            logger.warning("LLM circuit opened", failures=self.failures, reset_seconds=self.reset_seconds)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give up a probe slot without an outcome (cancelled or not an availability error)"""
+        self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = {"state": self.state, "consecutive_failures": self.failures}
+        if self.state == OPEN:
+            snapshot["retry_in_seconds"] = round(max(self.reset_seconds - (time.monotonic() - self.opened_at), 0.0), 1)
+        return snapshot
+
+
+class ResilientLLM:
+    """Wraps a LangChain chat model with deadlines, retries, hedging and a circuit breaker.
+
+    Each attempt gets ``attempt_timeout`` seconds and the whole call
+    ``timeout`` seconds. Failed attempts are retried with full-jitter
+    exponential backoff while the error is retryable and the deadline allows.
+    With a ``secondary`` model, an attempt still running after ``hedge_delay``
+    seconds is raced against the same request on the secondary; the first
+    answer wins and the other call is cancelled. Streams are retried only
+    until their first chunk and are not hedged.
+
+    Without a ``primary``, ``loader`` builds the (primary, secondary) models
+    in a worker thread on first use, keeping heavy client imports off the
+    startup path and the event loop.
+    """
+
+    def __init__(self, primary: Any, semaphore: asyncio.Semaphore, breaker: CircuitBreaker, timeout: float,
+                 attempt_timeout: float, max_retries: int, backoff_base: float, backoff_max: float,
+                 secondary: Any = None, hedge_delay: float = 0.0,
+                 loader: Optional[Callable[[], Tuple[Any, Any]]] = None):
+        self.primary = primary
+        self.secondary = secondary
+        self.loader = loader
+        self.load_failed = False
+        self._load_lock: Optional[asyncio.Lock] = None
+        self.semaphore = semaphore
+        self.breaker = breaker
+        self.timeout = timeout
+        self.attempt_timeout = attempt_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_delay = hedge_delay
+
+    def available(self) -> bool:
+        """False while the breaker is open and calls would be rejected"""
+        if self.load_failed:
+            return False
+        return self.breaker.state != OPEN or time.monotonic() - self.breaker.opened_at >= self.breaker.reset_seconds
+
+    async def load(self):
+        """Build the models with ``loader`` unless they exist, raising LLMUnavailableError on failure"""
+        if self.primary is not None:
+            return
+        if self.loader is None or self.load_failed:
+            raise LLMUnavailableError("LLM client could not be initialized")
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self.primary is not None:
+                return
+            try:
+                self.primary, self.secondary = await asyncio.to_thread(self.loader)
+            except Exception as e:
+                self.load_failed = True
+                logger.warning("LLM client could not be initialized", error=repr(e))
+                raise LLMUnavailableError("LLM client could not be initialized") from e
+
+    def _admit(self):
+        if not self.breaker.allow():
+            metrics.LLM_SHORT_CIRCUITS.inc()
+            raise CircuitOpenError("LLM circuit breaker is open")
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _settle(self, error: BaseException):
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    async def _retry_after(self, error: BaseException, attempt: int, deadline: float) -> bool:
+        """Sleep before the next attempt, or return False when the error is final"""
+        delay = self._backoff(attempt)
+        if (attempt >= self.max_retries or not is_retryable(error) or self.breaker.state == OPEN
+                or time.monotonic() + delay >= deadline):
+            return False
+        metrics.LLM_RETRIES.inc(error=type(error).__name__)
+        logger.info("Retrying LLM call", attempt=attempt + 1, delay=round(delay, 3), error=repr(error))
+        await asyncio.sleep(delay)
+        return True
+
+    async def _call(self, model: Any, messages: List[Any]) -> str:
+        async with self.semaphore:
+            response = await model.ainvoke(messages)
+        return response.content
+
+    async def _attempt(self, messages: List[Any], timeout: float) -> str:
+        primary = asyncio.ensure_future(self._call(self.primary, messages))
+        tasks = [primary]
+        try:
+            if self.secondary is None or self.hedge_delay >= timeout:
+                return await asyncio.wait_for(primary, timeout)
+
+            deadline = time.monotonic() + timeout
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            if done:
+                return primary.result()
+
+            metrics.LLM_HEDGES.inc(outcome="sent")
+            tasks.append(asyncio.ensure_future(self._call(self.secondary, messages)))
+            error: Optional[BaseException] = None
+            while tasks:
+                done, _ = await asyncio.wait(tasks, timeout=max(deadline - time.monotonic(), 0),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        if task is not primary:
+                            metrics.LLM_HEDGES.inc(outcome="won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def ainvoke(self, messages: List[Any]) -> str:
+        """Complete ``messages``, raising CircuitOpenError or the last error on failure"""
+        await self.load()
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self._admit()
+            try:
+                timeout = min(self.attempt_timeout, max(deadline - time.monotonic(), 0))
+                result = await self._attempt(messages, timeout)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self._settle(e)
+                if not await self._retry_after(e, attempt, deadline):
+                    raise
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def astream(self, messages: List[Any]) -> AsyncIterator[str]:
+        """Yield content chunks; failures before the first chunk are retried"""
+        await self.load()
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self._admit()
+            started = False
+            settled = False
+            try:
+                async with self.semaphore:
+                    stream = self.primary.astream(messages).__aiter__()
+                    first_chunk_by = min(deadline, time.monotonic() + self.attempt_timeout)
+                    while True:
+                        limit = deadline if started else first_chunk_by
+                        try:
+                            chunk = await asyncio.wait_for(stream.__anext__(), timeout=max(limit - time.monotonic(), 0))
+                        except StopAsyncIteration:
+                            break
+                        if chunk.content:
+                            started = True
+                            yield chunk.content
+                self.breaker.record_success()
+                settled = True
+                return
+            except Exception as e:
+                self._settle(e)
+                settled = True
+                if started or not await self._retry_after(e, attempt, deadline):
+                    raise
+                attempt += 1
+            finally:
+                # Cancelled or closed by the consumer
+                if not settled:
+                    self.breaker.release()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.snapshot(),
+            "hedging": self.secondary is not None,
+        }
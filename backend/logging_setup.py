@@ -0,0 +1,77 @@
+import json
+import logging
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from config import Config
+
+# Session of the request being handled, attached to every log line
+current_session_id: ContextVar[Optional[str]] = ContextVar("current_session_id", default=None)
+
+_RESERVED = {"exc_info", "stack_info", "stacklevel", "extra"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, session and fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        session_id = current_session_id.get()
+        if session_id:
+            entry["session_id"] = session_id
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable variant for local development"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = dict(getattr(record, "fields", {}))
+        session_id = current_session_id.get()
+        if session_id:
+            fields = {"session_id": session_id, **fields}
+        suffix = " ".join(f"{key}={value}" for key, value in fields.items())
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.getMessage()}"
+        if suffix:
+            line = f"{line} {suffix}"
+        if record.exc_info:
+            line = f"{line}\n{self.formatException(record.exc_info)}"
+        return line
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger taking structured fields as keyword arguments.
+
+        logger.info("LLM call failed", stage="greeting", error="Timeout")
+    """
+
+    def process(self, msg: Any, kwargs: Dict[str, Any]):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in _RESERVED}
+        kwargs.setdefault("extra", {})["fields"] = fields
+        return msg, kwargs
+
+
+def configure_logging():
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if Config.LOG_FORMAT == "json" else TextFormatter())
+    root = logging.getLogger("astrologer")
+    root.handlers[:] = [handler]
+    root.setLevel(Config.LOG_LEVEL)
+    root.propagate = False
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(logging.getLogger(f"astrologer.{name}"), {})
+
+
+configure_logging()
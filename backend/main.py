@@ -1,20 +1,64 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, ValidationError
 import os
-from typing import List, Optional, Dict, Any
-import json
-from datetime import datetime
+import asyncio
+import math
+import re
+import time
+from typing import Annotated, List, Optional, Dict, Any, AsyncIterator, Iterable, Tuple, Union
+from collections import OrderedDict, deque
+import hashlib
+import importlib.util
+from contextlib import asynccontextmanager
 from config import Config
+from session_store import SessionConflict, SessionLease, SessionLocks, SessionStoreBusy, create_session_store
+from session_archive import SessionArchive
+from message_log import MessageLog, USER, ASSISTANT
+from classifier import classify_answers
+from content import ContentStore
+from response_cache import ResponseCache
+from context_builder import RollingSummary, TokenCounter, build_context
+from logging_setup import current_session_id, get_logger
+from responses import JSONBytesResponse, PayloadCache, PreparedPayload, dumps, payload_response
+from llm_client import CircuitBreaker, LLMUnavailableError, ResilientLLM, STATE_CODES
+from admission import BodySizeLimitMiddleware, InFlightLimiter, InFlightSlot, RateLimiter, retry_after_header
+import metrics
 
 # Validate configuration
 Config.validate()
 
-# LangChain imports
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+logger = get_logger("api")
 
-app = FastAPI(title="Pandit Pradeep Kiradoo Astrology API", version="2.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    cold_start = time.time() - metrics.process_start_time()
+    metrics.COLD_START.set(cold_start)
+    logger.info("Startup complete", cold_start_seconds=round(cold_start, 3), slim_mode=Config.SLIM_MODE)
+    warmup = asyncio.ensure_future(warm_up_llm()) if Config.LLM_WARMUP and GROQ_AVAILABLE else None
+    compaction = asyncio.ensure_future(run_compaction()) if archive is not None else None
+    yield
+    for task in (warmup, compaction):
+        if task is not None:
+            task.cancel()
+
+async def warm_up_llm():
+    """Build the Groq client in the background once the server is accepting requests"""
+    try:
+        await llm_client.load()
+    except LLMUnavailableError:
+        pass
+
+app = FastAPI(title="Pandit Pradeep Kiradoo Astrology API", version="2.0.0", lifespan=lifespan)
+
+# Reject oversized bodies before they are buffered (inside CORS so browsers can read the 413)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    default_limit=Config.MAX_BODY_BYTES,
+    path_limits={"/chat/batch": Config.MAX_BATCH_BODY_BYTES}
+)
 
 # CORS middleware to allow frontend requests
 app.add_middleware(
@@ -25,231 +69,316 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Groq LLM (with fallback)
-try:
-    llm = ChatGroq(
+def create_chat_model(model_name: str) -> Any:
+    # Imported here so startup and the rule-based flow never load LangChain
+    from langchain_groq import ChatGroq
+    # Retries are handled by ResilientLLM, not the Groq SDK
+    return ChatGroq(
         groq_api_key=Config.GROQ_API_KEY,
-        model_name=Config.MODEL_NAME,
+        model_name=model_name,
         temperature=Config.TEMPERATURE,
-        max_tokens=Config.MAX_TOKENS
+        max_tokens=Config.MAX_TOKENS,
+        groq_api_base=Config.GROQ_API_BASE,
+        max_retries=0
     )
-    GROQ_AVAILABLE = True
-except:
-    GROQ_AVAILABLE = False
-    print("⚠️ GROQ API not available, using fallback responses")
+
+# Bound the number of in-flight Groq calls per worker
+llm_semaphore = asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY)
+
+# The Groq client is built on first use; slim mode never builds it
+GROQ_AVAILABLE = not Config.SLIM_MODE and importlib.util.find_spec("langchain_groq") is not None
+if not GROQ_AVAILABLE:
+    logger.warning("GROQ API not available, using fallback responses", slim_mode=Config.SLIM_MODE)
+
+def load_chat_models() -> Tuple[Any, Any]:
+    """Primary and hedge Groq clients, built by llm_client on first use"""
+    started = time.perf_counter()
+    primary = create_chat_model(Config.MODEL_NAME)
+    secondary = create_chat_model(Config.HEDGE_MODEL_NAME) if Config.HEDGE_MODEL_NAME else None
+    metrics.LLM_INIT.set(time.perf_counter() - started)
+    logger.info("Groq client initialized", seconds=round(time.perf_counter() - started, 3))
+    return primary, secondary
+
+# Deadlines, retries, hedging and the circuit breaker around Groq calls
+llm_client = ResilientLLM(
+    None, llm_semaphore,
+    CircuitBreaker(Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_SECONDS),
+    timeout=Config.LLM_TIMEOUT_SECONDS,
+    attempt_timeout=Config.LLM_ATTEMPT_TIMEOUT_SECONDS,
+    max_retries=Config.LLM_MAX_RETRIES,
+    backoff_base=Config.LLM_RETRY_BACKOFF_SECONDS,
+    backoff_max=Config.LLM_RETRY_BACKOFF_MAX_SECONDS,
+    hedge_delay=Config.HEDGE_DELAY_SECONDS,
+    loader=load_chat_models
+)
+metrics.register_gauge("llm_circuit_state", "LLM circuit breaker state (0 closed, 1 half-open, 2 open)",
+                       lambda: STATE_CODES[llm_client.breaker.state])
+
+# Admission control: token buckets per client IP and per session, and a cap on
+# LLM turns in flight so overload is answered with 429 instead of a long queue
+ip_limiter = RateLimiter(Config.IP_RATE_PER_MINUTE, Config.IP_BURST, Config.RATE_LIMIT_MAX_KEYS)
+session_limiter = RateLimiter(Config.SESSION_RATE_PER_MINUTE, Config.SESSION_BURST, Config.RATE_LIMIT_MAX_KEYS)
+llm_inflight = InFlightLimiter(Config.LLM_MAX_INFLIGHT, Config.LLM_RETRY_AFTER_SECONDS)
+metrics.register_gauge("llm_inflight_turns", "Chat turns admitted to the LLM and not yet finished",
+                       lambda: llm_inflight.in_flight)
+
+# Local tokenizer for budgeting the LLM context window
+token_counter = TokenCounter()
+
+# Recent time-to-first-token samples (seconds) from /chat/stream
+ttft_samples = deque(maxlen=1000)
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before its response is ready"""
+
+class ReplyInterrupted(Exception):
+    """Raised when the LLM stream breaks off after part of the reply was sent"""
 
 # Define the state structure
 class AstrologyState:
+    __slots__ = ("messages", "problem_understood", "remedies_provided", "session_id", "current_stage", "history_hash", "summary",
+                 "version", "idempotency_keys")
+    
     def __init__(self):
-        self.messages: List[Dict[str, Any]] = []
+        self.messages = MessageLog()
         self.problem_understood: bool = False
         self.remedies_provided: bool = False
         self.session_id: str = ""
         self.current_stage: str = "greeting"
+        # Delta protocol bookkeeping: a rolling hash over the user turns, so
+        # clients only send what is new
+        self.history_hash: str = ""
+        # Rolling summary of turns that no longer fit in the LLM context window
+        self.summary = RollingSummary()
+        # Bumped by the session store on every save (optimistic concurrency)
+        self.version: int = 0
+        # Idempotency-Key -> [assistant message index, seq, history_hash, stage]
+        # of the turn it answered, oldest first
+        self.idempotency_keys: Dict[str, List[Any]] = {}
+    
+    @property
+    def user_turns(self) -> int:
+        return self.messages.user_count
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "messages": self.messages.to_list(),
+            "problem_understood": self.problem_understood,
+            "remedies_provided": self.remedies_provided,
+            "current_stage": self.current_stage,
+            "history_hash": self.history_hash,
+            "summary": self.summary.to_dict(),
+            "version": self.version,
+            "idempotency_keys": self.idempotency_keys
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AstrologyState":
+        state = cls()
+        state.session_id = data["session_id"]
+        state.messages = MessageLog.from_list(data["messages"])
+        state.problem_understood = data["problem_understood"]
+        state.remedies_provided = data["remedies_provided"]
+        state.current_stage = data["current_stage"]
+        state.history_hash = data["history_hash"]
+        if "summary" in data:
+            state.summary = RollingSummary.from_dict(data["summary"])
+        state.version = data.get("version", 0)
+        state.idempotency_keys = data.get("idempotency_keys", {})
+        return state
+    
+    def add_user_turn(self, content: str):
+        self.messages.append(USER, content)
+        self.history_hash = chain_history_hash(self.history_hash, content)
+
+def chain_history_hash(previous: str, content: str) -> str:
+    """Extend a rolling history hash with one more user turn"""
+    return hashlib.sha256(f"{previous}\x1f{content}".encode("utf-8")).hexdigest()[:16]
+
+# State management (backend chosen by Config.SESSION_BACKEND)
+sessions = create_session_store(AstrologyState)
+# Serializes the turns of each session within this worker; across workers
+# the store's versioned saves catch concurrent writes
+session_locks = SessionLocks()
+def session_store_busy() -> HTTPException:
+    """503 for a session store call that gave up waiting on another worker"""
+    return HTTPException(status_code=503, detail="Session store is busy, please retry", headers=retry_after_header(1))
+
+@app.exception_handler(SessionStoreBusy)
+async def handle_session_store_busy(request: Request, exc: SessionStoreBusy):
+    error = session_store_busy()
+    return JSONBytesResponse(dumps({"detail": error.detail}), status_code=error.status_code, headers=error.headers)
 
-# State management
-sessions: Dict[str, AstrologyState] = {}
-
-# Fallback responses for when GROQ is not available
-FALLBACK_RESPONSES = {
-    "greeting": [
-        "**Namaste! 🙏** I am Pandit Pradeep Kiradoo, your Vedic astrology guide. Please tell me about the challenges or problems you're facing, and I'll provide astrological remedies based on planetary influences.",
-        "**Welcome!** I am Pandit Pradeep Kiradoo, a Vedic astrologer with 15+ years of experience. How may I help you with your life's challenges today?",
-        "**Jai Shree Ram! 🙏** I am Pandit Pradeep Kiradoo. Please share your concerns, and I'll guide you with Vedic wisdom and planetary remedies."
-    ],
-    "question_1": [
-        "Thank you for sharing your concern. **How long have you been facing this issue?** Please tell me the duration - whether it's been days, weeks, months, or years.",
-        "I understand you're going through difficulties. **When did this problem first start affecting you?** Knowing the timeline will help me provide better astrological guidance.",
-        "Thank you for opening up. **How long has this been going on?** The duration of your challenge is important for understanding the planetary influences."
-    ],
-    "question_2": [
-        "Thank you for that information. **How does this issue affect your daily life?** Does it impact your work, relationships, health, or other areas?",
-        "I see. **In what ways does this problem impact your daily routine?** Understanding the effects will help me identify the specific planetary influences.",
-        "Thank you. **How does this challenge affect your work, relationships, or health?** This helps me understand the scope of the problem."
-    ],
-    "question_3": [
-        "I understand the impact. **What have you already tried to resolve this issue?** Have you attempted any solutions, remedies, or approaches?",
-        "Thank you for sharing that. **What solutions have you attempted so far?** Knowing what you've tried helps me suggest different astrological remedies.",
-        "I see. **What have you already tried to solve this problem?** This information helps me provide remedies that complement your efforts."
-    ],
-    "question_4": [
-        "Thank you for that information. **How do you feel emotionally about this situation?** Are you feeling stressed, anxious, frustrated, or any other emotions?",
-        "I understand. **What emotions do you experience because of this challenge?** Your emotional state is important for understanding the planetary influences.",
-        "Thank you. **How do you feel about this situation emotionally?** Are you feeling overwhelmed, hopeful, or any other specific emotions?"
-    ],
-    "question_5": [
-        "Thank you for sharing your feelings. **Are there any specific symptoms or manifestations you've noticed?** Any particular patterns or recurring issues?",
-        "I understand your emotional state. **Can you describe any specific symptoms or patterns you've observed?** This helps me provide targeted remedies.",
-        "Thank you. **What specific symptoms or manifestations have you noticed?** Any particular issues or patterns that stand out?"
-    ],
-    "analysis": [
-        "**Based on Vedic Astrology Analysis** 🌟\n\nYour challenges appear to be related to planetary influences. Here are the recommended remedies:\n\n**1. Spiritual Practices**\n• Chant the **Gayatri Mantra** daily for spiritual strength\n• Perform **Surya Namaskar** (Sun Salutation) in the morning\n\n**2. Gemstone Recommendations**\n• Wear a **Blue Sapphire** (if Saturn is weak) or **Ruby** (if Sun is weak)\n\n**3. Donation & Charity**\n• Donate **yellow items** on Thursdays for Jupiter's blessings\n\n**4. Daily Rituals**\n• Light a **ghee lamp** in front of Lord Ganesha daily",
-        "**Vedic Astrology Remedies** ✨\n\nAccording to planetary analysis, here are effective solutions:\n\n**1. Mantra & Prayer**\n• Recite **Hanuman Chalisa** daily for strength and courage\n• Perform **Rudrabhishek** for Shiva's blessings\n\n**2. Gemstone Therapy**\n• Wear a **Pearl** for Moon's positive influence\n\n**3. Charity & Donation**\n• Donate **white items** on Mondays\n\n**4. Meditation Practice**\n• Practice meditation during **Brahma Muhurat** (4-6 AM)",
-        "**Planetary Pacification Remedies** 🙏\n\nVedic astrology indicates you need planetary pacification:\n\n**1. Mantra Chanting**\n• Chant **Om Namah Shivaya** 108 times daily\n\n**2. Gemstone Recommendations**\n• Wear an **Emerald** for Mercury's positive influence\n\n**3. Sacred Rituals**\n• Perform **Ganga Aarti** for purification\n\n**4. Charity Work**\n• Donate **green items** on Wednesdays\n\n**5. Energy Practices**\n• Practice **Pranayama** for energy balance"
-    ],
-    "ongoing": [
-        "**Continue with these remedies regularly.** Remember, consistency is key in Vedic practices. Is there anything specific about these remedies you'd like me to explain further?",
-        "**These remedies will bring positive changes gradually.** Stay patient and maintain faith. Would you like guidance on any other aspect of your life?",
-        "**The remedies I've suggested are based on ancient Vedic wisdom.** Follow them with devotion and you'll see positive results. Do you have any other concerns?"
-    ]
-}
-
-def get_fallback_response(stage: str, user_message: str = "", all_messages: List[Dict[str, Any]] = []) -> str:
+# Compressed, append-only archive for finished and idle sessions (see compact_sessions)
+archive = SessionArchive(Config.ARCHIVE_DIR, Config.ARCHIVE_COMPRESSION, Config.ARCHIVE_SEGMENT_BYTES) \
+    if Config.ARCHIVE_ENABLED else None
+# Idempotency-Key -> session created by that key's turn, so a retried first
+# turn (sent without a session id) finds its session (per worker)
+created_sessions: "OrderedDict[str, str]" = OrderedDict()
+metrics.register_gauge("sessions_active", "Sessions held by the session store", lambda: len(sessions))
+
+# Questions, suggestions, canned responses and remedies (hot-reloaded)
+content_store = ContentStore(Config.CONTENT_PATH)
+
+def get_fallback_response(stage: str, user_message: str = "", all_messages: Optional[MessageLog] = None) -> str:
     """Get a fallback response when GROQ is not available"""
     import random
     
-    responses = FALLBACK_RESPONSES.get(stage, FALLBACK_RESPONSES["ongoing"])
+    content = content_store.current()
     
     # For analysis stage, analyze all user answers to provide personalized remedies
     if stage == "analysis":
-        # Extract user answers from the conversation
-        user_answers = []
-        for msg in all_messages:
-            if msg["role"] == "user":
-                user_answers.append(msg["content"].lower())
-        
-        # Analyze the problem type from the first answer
-        problem_type = "general"
-        if any(word in user_answers[0] for word in ["career", "job", "work", "business"]):
-            problem_type = "career"
-        elif any(word in user_answers[0] for word in ["relationship", "marriage", "love", "partner", "family"]):
-            problem_type = "relationship"
-        elif any(word in user_answers[0] for word in ["financial", "money", "wealth", "income", "debt"]):
-            problem_type = "financial"
-        elif any(word in user_answers[0] for word in ["health", "sick", "disease", "pain", "medical"]):
-            problem_type = "health"
-        
-        # Analyze duration from answer 2
-        duration = "medium"
-        if len(user_answers) > 2:
-            if any(word in user_answers[2] for word in ["days", "week", "recent"]):
-                duration = "recent"
-            elif any(word in user_answers[2] for word in ["months", "year", "long"]):
-                duration = "long"
-        
-        # Analyze impact from answer 3
-        impact = "general"
-        if len(user_answers) > 3:
-            if any(word in user_answers[3] for word in ["work", "job", "career"]):
-                impact = "work"
-            elif any(word in user_answers[3] for word in ["relationship", "family", "marriage"]):
-                impact = "relationships"
-            elif any(word in user_answers[3] for word in ["health", "sleep", "physical"]):
-                impact = "health"
-        
-        # Analyze emotions from answer 5
-        emotions = "stressed"
-        if len(user_answers) > 5:
-            if any(word in user_answers[5] for word in ["angry", "frustrated", "irritated"]):
-                emotions = "angry"
-            elif any(word in user_answers[5] for word in ["sad", "depressed", "hopeless"]):
-                emotions = "sad"
-            elif any(word in user_answers[5] for word in ["anxious", "worried", "fear"]):
-                emotions = "anxious"
-        
-        # Generate personalized remedies based on analysis
-        if problem_type == "career":
-            if duration == "long" and impact == "work":
-                return "**🕉️ Vedic Astrology Analysis - Career Challenges**\n\n*Om Namah Shivaya!* 🙏\n\n**Pandit Pradeep Kiradoo's Jyotish Analysis:**\n\nBased on your detailed responses, I can see that you've been facing career challenges for an extended period. According to Vedic astrology, this indicates a weak **Surya (Sun)** and challenging **Shani (Saturn)** in your horoscope. The Sun represents leadership, authority, and career success, while Saturn brings delays and obstacles.\n\n**🔮 Planetary Influences:**\n• **Surya (Sun)**: Currently in a weak position, affecting your career growth and leadership abilities\n• **Shani (Saturn)**: Creating obstacles and delays in your professional life\n• **Guru (Jupiter)**: Needs strengthening for wisdom and career guidance\n\n**🪔 Vedic Remedies (Upayas):**\n\n**1. Surya Upasana (Sun Worship)**\n• **Surya Namaskar**: Perform 12 rounds daily at sunrise facing east\n• **Surya Mantra**: Chant *\"Om Hraam Hreem Hraum Sah Suryaya Namah\"* 108 times daily\n• **Ruby Gemstone**: Wear a natural ruby ring on your ring finger on Sunday morning\n• **Surya Arghya**: Offer water to the Sun daily at sunrise\n\n**2. Shani Shanti (Saturn Pacification)**\n• **Shani Mantra**: Chant *\"Om Sham Shanicharaya Namah\"* 108 times on Saturdays\n• **Shani Puja**: Perform special prayers to Lord Shani every Saturday\n• **Sesame Oil Lamp**: Light a lamp with sesame oil on Saturdays\n• **Black Items Donation**: Donate black clothes, blankets, or oil to the needy\n\n**3. Career-Specific Vedic Remedies**\n• **Gayatri Mantra**: Chant 108 times daily before starting work\n• **Crystal Pyramid**: Keep a crystal pyramid on your work desk facing north\n• **Guru Puja**: Worship Lord Jupiter on Thursdays with yellow items\n• **Lakshmi Puja**: Perform Lakshmi puja on Fridays for prosperity\n\n**📿 Mantras for Daily Practice:**\n• *\"Om Aim Hreem Shreem Lakshmi Narayanaya Namah\"* (For career success)\n• *\"Om Namah Shivaya\"* (For removing obstacles)\n• *\"Om Gam Ganapataye Namah\"* (For success in endeavors)\n\n**⏰ Auspicious Timings:**\n• **Brahma Muhurat**: 4:00 AM - 6:00 AM (Best for spiritual practices)\n• **Surya Hora**: Sunrise time (Best for Sun-related remedies)\n• **Guru Hora**: Thursday mornings (Best for Jupiter remedies)\n\n**🌿 Additional Recommendations:**\n• **Fasting**: Fast on Sundays (Sun) and Saturdays (Saturn)\n• **Temple Visits**: Visit Sun temples on Sundays and Hanuman temples on Tuesdays\n• **Charity**: Donate jaggery, wheat, and red items on Sundays\n\n**✨ Blessing:**\n*May Lord Surya bless you with career success and may Shani's obstacles be removed from your path. Follow these remedies with faith and devotion for 40 days to see positive results.*\n\n**Jai Shree Ram! 🙏**"
-            
-            elif emotions == "anxious":
-                return "**🕉️ Vedic Astrology Analysis - Career Anxiety**\n\n*Om Namah Shivaya!* 🙏\n\n**Pandit Pradeep Kiradoo's Jyotish Analysis:**\n\nYour career anxiety indicates an afflicted **Chandra (Moon)** and weak **Budh (Mercury)** in your horoscope. The Moon governs the mind and emotions, while Mercury controls communication and intelligence.\n\n**🔮 Planetary Influences:**\n• **Chandra (Moon)**: Afflicted, causing mental restlessness and anxiety\n• **Budh (Mercury)**: Weak, affecting communication and decision-making\n• **Mangal (Mars)**: Needs balancing for courage and confidence\n\n**🪔 Vedic Remedies (Upayas):**\n\n**1. Chandra Shanti (Moon Pacification)**\n• **Pearl Gemstone**: Wear a natural pearl ring on your little finger on Monday\n• **Chandra Mantra**: Chant *\"Om Shram Shreem Shraum Sah Chandramase Namah\"* 108 times daily\n• **White Items**: Donate white clothes, milk, or sweets on Mondays\n• **Moon Meditation**: Meditate during full moon nights\n\n**2. Budh Strengthening (Mercury Enhancement)**\n• **Emerald Gemstone**: Wear a natural emerald ring on your little finger on Wednesday\n• **Budh Mantra**: Chant *\"Om Bram Breem Braum Sah Budhaya Namah\"* 108 times on Wednesdays\n• **Green Items**: Donate green clothes or vegetables on Wednesdays\n• **Ganesha Puja**: Worship Lord Ganesha for intelligence\n\n**3. Mind Calming Remedies**\n• **Om Namah Shivaya**: Chant 108 times daily for peace\n• **Pranayama**: Practice Sheetali and Nadi Shodhana breathing\n• **Ghee Lamp**: Light a ghee lamp in front of Lord Shiva daily\n• **Hanuman Chalisa**: Recite daily for courage and strength\n\n**📿 Mantras for Mental Peace:**\n• *\"Om Mani Padme Hum\"* (For mental peace)\n• *\"Om Shanti Shanti Shanti\"* (For peace in all three worlds)\n• *\"Om Aim Hreem Shreem Saraswatyai Namah\"* (For wisdom)\n\n**⏰ Auspicious Timings:**\n• **Brahma Muhurat**: 4:00 AM - 6:00 AM (Best for meditation)\n• **Sandhya Kaal**: Dawn and dusk (Best for spiritual practices)\n• **Pradosh Kaal**: Evening twilight (Best for Shiva worship)\n\n**🌿 Additional Recommendations:**\n• **Fasting**: Fast on Mondays (Moon) and Wednesdays (Mercury)\n• **Temple Visits**: Visit Shiva temples and Hanuman temples regularly\n• **Charity**: Donate books, pens, and educational items\n\n**✨ Blessing:**\n*May Lord Chandra calm your mind and may Budh enhance your intelligence. Follow these remedies with devotion for 21 days to experience mental peace and career clarity.*\n\n**Jai Shree Ram! 🙏**"
-            
-            else:
-                return "**🕉️ Vedic Astrology Analysis - Career Guidance**\n\n*Om Namah Shivaya!* 🙏\n\n**Pandit Pradeep Kiradoo's Jyotish Analysis:**\n\nYour career situation indicates the need for strengthening **Surya (Sun)** and **Guru (Jupiter)** in your horoscope. These planets govern career success and professional growth.\n\n**🔮 Planetary Influences:**\n• **Surya (Sun)**: Needs strengthening for leadership and authority\n• **Guru (Jupiter)**: Requires enhancement for wisdom and career guidance\n• **Shukra (Venus)**: For professional skills and success\n\n**🪔 Vedic Remedies (Upayas):**\n\n**1. Surya Upasana (Sun Worship)**\n• **Surya Namaskar**: Perform 12 rounds daily at sunrise\n• **Surya Mantra**: Chant *\"Om Hraam Hreem Hraum Sah Suryaya Namah\"* 108 times\n• **Ruby Gemstone**: Wear a natural ruby ring on your ring finger\n• **Surya Arghya**: Offer water to the Sun daily\n\n**2. Guru Puja (Jupiter Worship)**\n• **Guru Mantra**: Chant *\"Om Gram Greem Graum Sah Gurve Namah\"* 108 times on Thursdays\n• **Yellow Sapphire**: Wear a natural yellow sapphire ring on your index finger\n• **Yellow Items**: Donate yellow clothes, books, or sweets on Thursdays\n• **Guru Puja**: Worship Lord Jupiter on Thursdays\n\n**3. Professional Success Remedies**\n• **Lakshmi Puja**: Perform Lakshmi puja on Fridays for prosperity\n• **Gayatri Mantra**: Chant 108 times daily for wisdom\n• **Hanuman Chalisa**: Recite daily for strength and courage\n• **Money Plant**: Keep a money plant in your office\n\n**📿 Mantras for Career Success:**\n• *\"Om Aim Hreem Shreem Lakshmi Narayanaya Namah\"* (For prosperity)\n• *\"Om Namah Shivaya\"* (For removing obstacles)\n• *\"Om Gam Ganapataye Namah\"* (For success)\n\n**⏰ Auspicious Timings:**\n• **Brahma Muhurat**: 4:00 AM - 6:00 AM (Best for spiritual practices)\n• **Surya Hora**: Sunrise time (Best for Sun remedies)\n• **Guru Hora**: Thursday mornings (Best for Jupiter remedies)\n\n**🌿 Additional Recommendations:**\n• **Fasting**: Fast on Sundays (Sun) and Thursdays (Jupiter)\n• **Temple Visits**: Visit Sun temples and Hanuman temples regularly\n• **Charity**: Donate jaggery, wheat, and yellow items\n\n**✨ Blessing:**\n*May Lord Surya bless you with career success and may Guru provide you with wisdom and guidance. Follow these remedies with faith for 40 days.*\n\n**Jai Shree Ram! 🙏**"
-        
-        elif problem_type == "relationship":
-            if emotions == "angry" and impact == "relationships":
-                return "**🕉️ Vedic Astrology Analysis - Relationship Anger**\n\n*Om Namah Shivaya!* 🙏\n\n**Pandit Pradeep Kiradoo's Jyotish Analysis:**\n\nYour anger affecting relationships indicates an afflicted **Mangal (Mars)** and weak **Shukra (Venus)** in your horoscope. Mars governs aggression and courage, while Venus controls love and relationships.\n\n**🔮 Planetary Influences:**\n• **Mangal (Mars)**: Afflicted, causing anger and aggression\n• **Shukra (Venus)**: Weak, affecting love and harmony in relationships\n• **Chandra (Moon)**: Needs pacification for emotional balance\n\n**🪔 Vedic Remedies (Upayas):**\n\n**1. Mangal Shanti (Mars Pacification)**\n• **Red Coral**: Wear a natural red coral ring on your ring finger on Tuesday\n• **Mangal Mantra**: Chant *\"Om Kram Kreem Kraum Sah Bhaumaya Namah\"* 108 times daily\n• **Red Items**: Donate red clothes, sweets, or items on Tuesdays\n• **Hanuman Puja**: Worship Lord Hanuman on Tuesdays\n\n**2. Shukra Strengthening (Venus Enhancement)**\n• **Pearl/Diamond**: Wear a natural pearl or diamond ring on your ring finger on Friday\n• **Shukra Mantra**: Chant *\"Om Dram Dreem Draum Sah Shukraya Namah\"* 108 times on Fridays\n• **Lakshmi Puja**: Perform Lakshmi puja on Fridays\n• **White Items**: Donate white sweets or clothes on Fridays\n\n**3. Anger Management Remedies**\n• **Sheetali Pranayama**: Practice cooling breath for anger control\n• **Om Namah Shivaya**: Chant 108 times daily for peace\n• **Rose-scented Lamp**: Light a rose-scented lamp on Fridays\n• **Loving-kindness Meditation**: Practice daily for compassion\n\n**📿 Mantras for Peace:**\n• *\"Om Shanti Shanti Shanti\"* (For peace in all three worlds)\n• *\"Om Mani Padme Hum\"* (For compassion)\n• *\"Om Aim Hreem Shreem Lakshmi Narayanaya Namah\"* (For love)\n\n**⏰ Auspicious Timings:**\n• **Brahma Muhurat**: 4:00 AM - 6:00 AM (Best for meditation)\n• **Sandhya Kaal**: Dawn and dusk (Best for spiritual practices)\n• **Shukra Hora**: Friday mornings (Best for Venus remedies)\n\n**🌿 Additional Recommendations:**\n• **Fasting**: Fast on Tuesdays (Mars) and Fridays (Venus)\n• **Temple Visits**: Visit Hanuman temples and Lakshmi temples\n• **Charity**: Donate to couples in need\n\n**✨ Blessing:**\n*May Lord Mangal control your anger and may Shukra bring love and harmony to your relationships. Follow these remedies with devotion for 21 days.*\n\n**Jai Shree Ram! 🙏**"
-            
-            elif duration == "long":
-                return "**🕉️ Vedic Astrology Analysis - Long-term Relationship Issues**\n\n*Om Namah Shivaya!* 🙏\n\n**Pandit Pradeep Kiradoo's Jyotish Analysis:**\n\nLong-term relationship problems indicate severely weak **Shukra (Venus)** and afflicted **Chandra (Moon)** in your horoscope. These planets are crucial for love, harmony, and emotional balance.\n\n**🔮 Planetary Influences:**\n• **Shukra (Venus)**: Severely weak, affecting love and relationships\n• **Chandra (Moon)**: Afflicted, causing emotional instability\n• **Guru (Jupiter)**: Needs strengthening for wisdom in relationships\n\n**🪔 Vedic Remedies (Upayas):**\n\n**1. Shukra Strengthening (Venus Enhancement)**\n• **Diamond/Pearl**: Wear a natural diamond or pearl ring on your ring finger on Friday\n• **Shukra Mantra**: Chant *\"Om Dram Dreem Draum Sah Shukraya Namah\"* 108 times daily\n• **Lakshmi Aarti**: Perform Lakshmi aarti daily\n• **White Items**: Donate white sweets, clothes, or milk on Fridays\n\n**2. Chandra Shanti (Moon Pacification)**\n• **Pearl Gemstone**: Wear a natural pearl ring on your little finger on Monday\n• **Chandra Mantra**: Chant *\"Om Shram Shreem Shraum Sah Chandramase Namah\"* 108 times on Mondays\n• **White Items**: Donate white items on Mondays\n• **Full Moon Meditation**: Meditate during full moon nights\n\n**3. Relationship Revival Remedies**\n• **Krishna Puja**: Light a ghee lamp in front of Lord Krishna daily\n• **Radha-Krishna Mantra**: Chant *\"Om Radha Krishnaya Namah\"* 108 times daily\n• **Rudrabhishek**: Perform Rudrabhishek for Shiva's blessings\n• **Couple Donation**: Donate to couples in need\n\n**📿 Mantras for Love:**\n• *\"Om Aim Hreem Shreem Lakshmi Narayanaya Namah\"* (For love and harmony)\n• *\"Om Radha Krishnaya Namah\"* (For divine love)\n• *\"Om Shanti Shanti Shanti\"* (For peace)\n\n**⏰ Auspicious Timings:**\n• **Brahma Muhurat**: 4:00 AM - 6:00 AM (Best for meditation)\n• **Sandhya Kaal**: Dawn and dusk (Best for spiritual practices)\n• **Purnima**: Full moon nights (Best for Moon remedies)\n\n**🌿 Additional Recommendations:**\n• **Fasting**: Fast on Fridays (Venus) and Mondays (Moon)\n• **Temple Visits**: Visit Krishna temples and Lakshmi temples\n• **Charity**: Donate to couples and families in need\n\n**✨ Blessing:**\n*May Lord Shukra bless you with love and may Chandra bring emotional harmony to your relationships. Follow these remedies with devotion for 40 days.*\n\n**Jai Shree Ram! 🙏**"
-            
-            else:
-                return "**🕉️ Vedic Astrology Analysis - Relationship Guidance**\n\n*Om Namah Shivaya!* 🙏\n\n**Pandit Pradeep Kiradoo's Jyotish Analysis:**\n\nYour relationship issues indicate the need for strengthening **Shukra (Venus)** and **Chandra (Moon)** in your horoscope. These planets govern love, harmony, and emotional balance.\n\n**🔮 Planetary Influences:**\n• **Shukra (Venus)**: Needs strengthening for love and relationships\n• **Chandra (Moon)**: Requires pacification for emotional balance\n• **Budh (Mercury)**: For communication in relationships\n\n**🪔 Vedic Remedies (Upayas):**\n\n**1. Shukra Strengthening (Venus Enhancement)**\n• **Pearl/Diamond**: Wear a natural pearl or diamond ring on your ring finger on Friday\n• **Shukra Mantra**: Chant *\"Om Dram Dreem Draum Sah Shukraya Namah\"* 108 times on Fridays\n• **Lakshmi Puja**: Perform Lakshmi puja on Fridays\n• **White Sweets**: Donate white sweets on Mondays\n\n**2. Chandra Shanti (Moon Pacification)**\n• **Pearl Gemstone**: Wear a natural pearl ring on your little finger on Monday\n• **Chandra Mantra**: Chant *\"Om Shram Shreem Shraum Sah Chandramase Namah\"* 108 times on Mondays\n• **White Items**: Donate white items on Mondays\n• **Rose-scented Lamp**: Light a rose-scented lamp on Fridays\n\n**3. Communication Enhancement**\n• **Emerald Gemstone**: Wear a natural emerald ring on your little finger on Wednesday\n• **Budh Mantra**: Chant *\"Om Bram Breem Braum Sah Budhaya Namah\"* 108 times on Wednesdays\n• **Ganesha Puja**: Worship Lord Ganesha for communication\n• **Mindful Communication**: Practice daily\n\n**📿 Mantras for Relationships:**\n• *\"Om Aim Hreem Shreem Lakshmi Narayanaya Namah\"* (For love and harmony)\n• *\"Om Shanti Shanti Shanti\"* (For peace)\n• *\"Om Gam Ganapataye Namah\"* (For removing obstacles)\n\n**⏰ Auspicious Timings:**\n• **Brahma Muhurat**: 4:00 AM - 6:00 AM (Best for meditation)\n• **Sandhya Kaal**: Dawn and dusk (Best for spiritual practices)\n• **Shukra Hora**: Friday mornings (Best for Venus remedies)\n\n**🌿 Additional Recommendations:**\n• **Fasting**: Fast on Fridays (Venus) and Mondays (Moon)\n• **Temple Visits**: Visit Lakshmi temples and Krishna temples\n• **Charity**: Donate to couples in need\n\n**✨ Blessing:**\n*May Lord Shukra bless you with love and may Chandra bring emotional harmony to your relationships. Follow these remedies with faith for 21 days.*\n\n**Jai Shree Ram! 🙏**"
-        
-        elif problem_type == "financial":
-            return "**🕉️ Vedic Astrology Analysis - Financial Guidance**\n\n*Om Namah Shivaya!* 🙏\n\n**Pandit Pradeep Kiradoo's Jyotish Analysis:**\n\nYour financial challenges indicate the need for strengthening **Guru (Jupiter)** and **Shukra (Venus)** in your horoscope. These planets govern wealth, prosperity, and material success.\n\n**🔮 Planetary Influences:**\n• **Guru (Jupiter)**: Needs strengthening for wealth and prosperity\n• **Shukra (Venus)**: Requires enhancement for material success\n• **Kuber (Wealth God)**: For financial stability\n\n**🪔 Vedic Remedies (Upayas):**\n\n**1. Guru Puja (Jupiter Worship)**\n• **Yellow Sapphire**: Wear a natural yellow sapphire ring on your index finger on Thursday\n• **Guru Mantra**: Chant *\"Om Gram Greem Graum Sah Gurve Namah\"* 108 times on Thursdays\n• **Yellow Items**: Donate yellow clothes, books, or sweets on Thursdays\n• **Guru Puja**: Worship Lord Jupiter on Thursdays\n\n**2. Lakshmi Puja (Wealth Worship)**\n• **Lakshmi Aarti**: Perform Lakshmi aarti daily\n• **Lakshmi Mantra**: Chant *\"Om Aim Hreem Shreem Lakshmi Narayanaya Namah\"* 108 times daily\n• **Ghee Lamp**: Light a ghee lamp in front of Lakshmi daily\n• **Money Plant**: Keep a money plant in your home\n\n**3. Kuber Puja (Wealth God Worship)**\n• **Kuber Mantra**: Chant *\"Om Yakshaya Kuberaya Vaishravanaya Dhanadhanyadi Padayeh Dhana-dhanya Samriddhi Me Dehi Tapaya Swaha\"* daily\n• **Kuber Puja**: Perform Kuber puja on Fridays\n• **Temple Donation**: Donate to temples regularly\n• **Charity**: Donate to the needy\n\n**📿 Mantras for Wealth:**\n• *\"Om Aim Hreem Shreem Lakshmi Narayanaya Namah\"* (For prosperity)\n• *\"Om Kuberaya Namah\"* (For wealth)\n• *\"Om Gam Ganapataye Namah\"* (For success)\n\n**⏰ Auspicious Timings:**\n• **Brahma Muhurat**: 4:00 AM - 6:00 AM (Best for spiritual practices)\n• **Guru Hora**: Thursday mornings (Best for Jupiter remedies)\n• **Shukra Hora**: Friday mornings (Best for Venus remedies)\n\n**🌿 Additional Recommendations:**\n• **Fasting**: Fast on Thursdays (Jupiter) and Fridays (Venus)\n• **Temple Visits**: Visit Lakshmi temples and Kuber temples\n• **Charity**: Donate yellow items and sweets\n\n**✨ Blessing:**\n*May Lord Guru bless you with wealth and may Lakshmi bring prosperity to your life. Follow these remedies with devotion for 40 days.*\n\n**Jai Shree Ram! 🙏**"
-        
-        elif problem_type == "health":
-            return "**🕉️ Vedic Astrology Analysis - Health Guidance**\n\n*Om Namah Shivaya!* 🙏\n\n**Pandit Pradeep Kiradoo's Jyotish Analysis:**\n\nYour health concerns indicate the need for strengthening **Mangal (Mars)** and pacifying **Chandra (Moon)** in your horoscope. These planets govern physical health and mental well-being.\n\n**🔮 Planetary Influences:**\n• **Mangal (Mars)**: Needs strengthening for physical health and vitality\n• **Chandra (Moon)**: Requires pacification for mental health\n• **Dhanvantari (Health God)**: For overall wellness\n\n**🪔 Vedic Remedies (Upayas):**\n\n**1. Mangal Strengthening (Mars Enhancement)**\n• **Red Coral**: Wear a natural red coral ring on your ring finger on Tuesday\n• **Mangal Mantra**: Chant *\"Om Kram Kreem Kraum Sah Bhaumaya Namah\"* 108 times daily\n• **Red Items**: Donate red clothes, sweets, or items on Tuesdays\n• **Hanuman Puja**: Worship Lord Hanuman on Tuesdays\n\n**2. Chandra Shanti (Moon Pacification)**\n• **Pearl Gemstone**: Wear a natural pearl ring on your little finger on Monday\n• **Chandra Mantra**: Chant *\"Om Shram Shreem Shraum Sah Chandramase Namah\"* 108 times on Mondays\n• **White Items**: Donate white clothes, milk, or sweets on Mondays\n• **Moon Meditation**: Meditate during full moon nights\n\n**3. Health Enhancement Remedies**\n• **Om Namah Shivaya**: Chant 108 times daily for healing\n• **Rudrabhishek**: Perform Rudrabhishek for Shiva's blessings\n• **Dhanvantari Puja**: Worship Lord Dhanvantari for health\n• **Yoga and Pranayama**: Practice daily for physical and mental health\n\n**📿 Mantras for Health:**\n• *\"Om Namah Shivaya\"* (For healing)\n• *\"Om Dhanvantaraye Namah\"* (For health)\n• *\"Om Hanumate Rudraatmakaya Hum Phat\"* (For strength)\n\n**⏰ Auspicious Timings:**\n• **Brahma Muhurat**: 4:00 AM - 6:00 AM (Best for yoga and meditation)\n• **Sandhya Kaal**: Dawn and dusk (Best for spiritual practices)\n• **Mangal Hora**: Tuesday mornings (Best for Mars remedies)\n\n**🌿 Additional Recommendations:**\n• **Fasting**: Fast on Tuesdays (Mars) and Mondays (Moon)\n• **Temple Visits**: Visit Hanuman temples and Shiva temples\n• **Charity**: Donate red items and health-related items\n\n**✨ Blessing:**\n*May Lord Mangal strengthen your health and may Chandra bring mental peace. Follow these remedies with devotion for 21 days.*\n\n**Jai Shree Ram! 🙏**"
-        
-        else:
-            return "**🕉️ Vedic Astrology Analysis - Life Guidance**\n\n*Om Namah Shivaya!* 🙏\n\n**Pandit Pradeep Kiradoo's Jyotish Analysis:**\n\nYour life challenges indicate the need for comprehensive planetary pacification and spiritual strengthening. This will bring balance and harmony to all aspects of your life.\n\n**🔮 Planetary Influences:**\n• **Surya (Sun)**: Needs strengthening for overall success\n• **Shani (Saturn)**: Requires pacification for removing obstacles\n• **Guru (Jupiter)**: For wisdom and guidance\n\n**🪔 Vedic Remedies (Upayas):**\n\n**1. Surya Upasana (Sun Worship)**\n• **Surya Namaskar**: Perform 12 rounds daily at sunrise\n• **Surya Mantra**: Chant *\"Om Hraam Hreem Hraum Sah Suryaya Namah\"* 108 times daily\n• **Ruby Gemstone**: Wear a natural ruby ring on your ring finger on Sunday\n• **Surya Arghya**: Offer water to the Sun daily\n\n**2. Shani Shanti (Saturn Pacification)**\n• **Shani Mantra**: Chant *\"Om Sham Shanicharaya Namah\"* 108 times on Saturdays\n• **Blue Sapphire**: Wear a natural blue sapphire ring on your middle finger on Saturday\n• **Black Items**: Donate black clothes, blankets, or oil on Saturdays\n• **Sesame Oil Lamp**: Light a lamp with sesame oil on Saturdays\n\n**3. Spiritual Strengthening**\n• **Gayatri Mantra**: Chant 108 times daily for spiritual strength\n• **Om Namah Shivaya**: Chant 108 times daily for peace\n• **Hanuman Chalisa**: Recite daily for strength and courage\n• **Ghee Lamp**: Light a ghee lamp in front of Lord Ganesha daily\n\n**📿 Mantras for Life Success:**\n• *\"Om Aim Hreem Shreem Lakshmi Narayanaya Namah\"* (For prosperity)\n• *\"Om Namah Shivaya\"* (For peace and success)\n• *\"Om Gam Ganapataye Namah\"* (For removing obstacles)\n\n**⏰ Auspicious Timings:**\n• **Brahma Muhurat**: 4:00 AM - 6:00 AM (Best for spiritual practices)\n• **Sandhya Kaal**: Dawn and dusk (Best for meditation)\n• **Pradosh Kaal**: Evening twilight (Best for Shiva worship)\n\n**🌿 Additional Recommendations:**\n• **Fasting**: Fast on Sundays (Sun) and Saturdays (Saturn)\n• **Temple Visits**: Visit Sun temples, Hanuman temples, and Shiva temples\n• **Charity**: Donate to the needy regularly\n• **Meditation**: Practice meditation during Brahma Muhurat\n\n**✨ Blessing:**\n*May Lord Surya bless you with success, may Shani remove all obstacles, and may Guru provide you with wisdom. Follow these remedies with faith and devotion for 40 days.*\n\n**Jai Shree Ram! 🙏**"
+        # Classify all user answers in one pass with the precompiled keyword classifier
+        user_answers = all_messages.user_contents() if all_messages else []
+        classification = classify_answers(user_answers)
+        return content.remedy_for(classification.key)
     
     # For question stages, ask one question at a time
-    elif stage.startswith("question_"):
-        question_number = stage.split("_")[1]
-        if question_number == "1":
-            return "Thank you for sharing your concern. **How long have you been facing this issue?** Please tell me the duration - whether it's been days, weeks, months, or years."
-        elif question_number == "2":
-            return "Thank you for that information. **How does this issue affect your daily life?** Does it impact your work, relationships, health, or other areas?"
-        elif question_number == "3":
-            return "I understand the impact. **What have you already tried to resolve this issue?** Have you attempted any solutions, remedies, or approaches?"
-        elif question_number == "4":
-            return "Thank you for sharing that. **How do you feel emotionally about this situation?** Are you feeling stressed, anxious, frustrated, or any other emotions?"
-        elif question_number == "5":
-            return "Thank you for sharing your feelings. **Are there any specific symptoms or manifestations you've noticed?** Any particular patterns or recurring issues?"
+    if stage in content.questions:
+        return content.questions[stage]
     
+    responses = content.fallback_responses.get(stage, content.fallback_responses["ongoing"])
     return random.choice(responses)
 
-def get_ai_response(messages: List[Dict[str, Any]], stage: str) -> str:
+def uses_llm(stage: str) -> bool:
+    """Whether a stage is answered by the LLM rather than the rule-based flow"""
+    # Question and analysis stages always use fallback responses to ensure proper flow
+    if stage.startswith("question_") or stage == "analysis":
+        return False
+    return GROQ_AVAILABLE
+
+def fallback_for(messages: MessageLog, stage: str) -> str:
+    """Rule-based response for the latest turn of a conversation"""
+    user_message = ""
+    if messages:
+        user_message = messages[-1].content
+    return get_fallback_response(stage, user_message, messages)
+
+def build_llm_messages(messages: MessageLog, stage: str, summary: RollingSummary) -> List[Any]:
+    """Convert the conversation to (role, content) chat messages for the given stage"""
+    langchain_messages = [("system", SYSTEM_PROMPT)]
+    
+    # Newest messages that fit the token budget; older turns are summarized
+    summary_text, window = build_context(messages, summary, token_counter, Config.CONTEXT_TOKEN_BUDGET, Config.SUMMARY_TOKEN_BUDGET)
+    if summary_text:
+        langchain_messages.append(("system", f"Summary of the earlier conversation:\n{summary_text}"))
+    history_tokens = sum(messages.token_count(i, token_counter) for i in range(len(messages) - len(window), len(messages)))
+    metrics.PROMPT_TOKENS.observe(history_tokens + (token_counter(summary_text) if summary_text else 0))
+    
+    for msg in window:
+        if msg.role == "user":
+            langchain_messages.append(("human", msg.content))
+        elif msg.role == "assistant":
+            langchain_messages.append(("ai", msg.content))
+    
+    # Add stage-specific context
+    if stage == "greeting" and not messages:
+        context = "This is the first message. Provide a warm welcome and ask about their concerns."
+    elif stage == "understanding":
+        context = "The user has shared their problem. Ask clarifying questions to better understand their situation and identify planetary influences."
+    else:
+        context = "Continue the conversation naturally, providing guidance and support."
+    
+    langchain_messages.append(("human", context))
+    return langchain_messages
+
+def fallback_source(stage: str) -> str:
+    """Metrics label for a reply that did not come from the LLM"""
+    return "rule" if stage.startswith("question_") or stage == "analysis" else "fallback"
+
+async def get_ai_response(messages: MessageLog, stage: str, summary: RollingSummary) -> str:
     """Get AI response based on conversation context and stage"""
+    if not uses_llm(stage):
+        metrics.RESPONSES.inc(source=fallback_source(stage))
+        return fallback_for(messages, stage)
+    
+    started = time.perf_counter()
     try:
-        # For question stages and analysis stage, always use fallback responses to ensure proper flow
-        if stage.startswith("question_") or stage == "analysis":
-            user_message = ""
-            if messages:
-                user_message = messages[-1].get("content", "")
-            return get_fallback_response(stage, user_message, messages)
+        if response_cache is not None:
+            cached = response_cache.get(stage, messages)
+            if cached is not None:
+                metrics.RESPONSES.inc(source="cache")
+                return cached
         
-        if not GROQ_AVAILABLE:
-            # Use fallback responses
-            user_message = ""
-            if messages:
-                user_message = messages[-1].get("content", "")
-            return get_fallback_response(stage, user_message, messages)
-        
-        # Convert messages to LangChain format
-        langchain_messages = [SystemMessage(content=SYSTEM_PROMPT)]
-        
-        for msg in messages[-10:]:  # Keep last 10 messages for context
-            if msg["role"] == "user":
-                langchain_messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                langchain_messages.append(AIMessage(content=msg["content"]))
-        
-        # Add stage-specific context
-        if stage == "greeting" and not messages:
-            context = "This is the first message. Provide a warm welcome and ask about their concerns."
-        elif stage == "understanding":
-            context = "The user has shared their problem. Ask clarifying questions to better understand their situation and identify planetary influences."
-        else:
-            context = "Continue the conversation naturally, providing guidance and support."
-        
-        langchain_messages.append(HumanMessage(content=context))
-        
-        # Get response from LLM
-        response = llm.invoke(langchain_messages)
-        return response.content
+        # Get response from LLM without blocking the event loop
+        langchain_messages = build_llm_messages(messages, stage, summary)
+        response = await llm_client.ainvoke(langchain_messages)
+        metrics.LLM_LATENCY.observe(time.perf_counter() - started, outcome="ok")
+        metrics.RESPONSES.inc(source="llm")
+        if response_cache is not None:
+            response_cache.put(stage, messages, response)
+        return response
         
+    except LLMUnavailableError:
+        # Groq is unhealthy or unusable; answer from the rules without waiting
+        metrics.RESPONSES.inc(source="fallback")
+        return fallback_for(messages, stage)
     except Exception as e:
-        print(f"Error getting AI response: {e}")
+        metrics.LLM_LATENCY.observe(time.perf_counter() - started, outcome="error")
+        metrics.LLM_ERRORS.inc(error=type(e).__name__)
+        logger.error("Error getting AI response", stage=stage, error=repr(e))
         # Fallback to rule-based responses
-        user_message = ""
-        if messages:
-            user_message = messages[-1].get("content", "")
-        return get_fallback_response(stage, user_message, messages)
+        metrics.RESPONSES.inc(source="fallback")
+        return fallback_for(messages, stage)
+
+def chunk_text(text: str) -> List[str]:
+    """Split canned text into word-group chunks for streaming"""
+    words = re.findall(r"\S+\s*|\s+", text)
+    size = Config.STREAM_CHUNK_WORDS
+    return ["".join(words[i:i + size]) for i in range(0, len(words), size)]
+
+async def stream_ai_response(messages: MessageLog, stage: str, summary: RollingSummary) -> AsyncIterator[str]:
+    """Yield the response for the latest turn in chunks as they become available"""
+    cached = response_cache.get(stage, messages) if response_cache is not None and uses_llm(stage) else None
+    if cached is not None:
+        metrics.RESPONSES.inc(source="cache")
+        for chunk in chunk_text(cached):
+            yield chunk
+        return
+    
+    if uses_llm(stage):
+        started = False
+        parts = []
+        call_started = time.perf_counter()
+        try:
+            langchain_messages = build_llm_messages(messages, stage, summary)
+            async for chunk in llm_client.astream(langchain_messages):
+                started = True
+                parts.append(chunk)
+                yield chunk
+            if started:
+                metrics.LLM_LATENCY.observe(time.perf_counter() - call_started, outcome="ok")
+                metrics.RESPONSES.inc(source="llm")
+                if response_cache is not None:
+                    response_cache.put(stage, messages, "".join(parts))
+                return
+        except LLMUnavailableError:
+            pass
+        except Exception as e:
+            metrics.LLM_LATENCY.observe(time.perf_counter() - call_started, outcome="error")
+            metrics.LLM_ERRORS.inc(error=type(e).__name__)
+            logger.error("Error streaming AI response", stage=stage, error=repr(e))
+            if started:
+                # Part of the answer already reached the client; a fallback can't continue it
+                raise ReplyInterrupted() from e
+        metrics.RESPONSES.inc(source="fallback")
+    else:
+        metrics.RESPONSES.inc(source=fallback_source(stage))
+    
+    for chunk in chunk_text(fallback_for(messages, stage)):
+        yield chunk
 
-def determine_stage(messages: List[Dict[str, Any]]) -> str:
+def determine_stage(messages: MessageLog) -> str:
     """Determine the current conversation stage"""
     if not messages:
         return "greeting"
     
-    # Count user messages to determine stage
-    user_messages = [msg for msg in messages if msg["role"] == "user"]
-    message_count = len(user_messages)
-    
+    # Count user messages to determine stage (maintained on append)
+    return stage_for_user_count(messages.user_count)
+
+def stage_for_user_count(message_count: int) -> str:
+    """Stage reached after ``message_count`` user messages"""
     # Ask questions one by one - each question gets its own stage
     if message_count <= 1:
         return "greeting"
@@ -307,161 +436,679 @@ RESPONSE FORMATTING:
 
 Remember: Ask ONE question at a time and wait for the user's response."""
 
+# Cache of LLM replies, invalidated by any change to the prompt or model parameters
+response_cache = ResponseCache(
+    fingerprint=hashlib.sha256(
+        f"{SYSTEM_PROMPT}\x1f{Config.MODEL_NAME}\x1f{Config.TEMPERATURE}\x1f{Config.MAX_TOKENS}".encode("utf-8")
+    ).hexdigest(),
+    max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.RESPONSE_CACHE_TTL_SECONDS,
+    context_messages=Config.RESPONSE_CACHE_CONTEXT_MESSAGES,
+    similarity_threshold=Config.RESPONSE_CACHE_SIMILARITY
+) if Config.RESPONSE_CACHE_ENABLED else None
+
 # Pydantic models for API
 class ChatMessage(BaseModel):
     role: str
-    content: str
+    content: str = Field(max_length=Config.MAX_MESSAGE_CHARS)
 
 class ChatRequest(BaseModel):
-    messages: List[ChatMessage]
+    messages: List[ChatMessage] = Field(max_length=Config.MAX_MESSAGES_PER_REQUEST)
     session_id: Optional[str] = None
+    # Delta protocol: clients send only new turns together with the number of
+    # user turns (and history hash) the server last acknowledged. Requests
+    # without ``seq`` are treated as legacy full-history requests.
+    seq: Optional[int] = None
+    history_hash: Optional[str] = None
 
 class ChatResponse(BaseModel):
     message: str
     session_id: str
     stage: str
     suggestions: List[str]
+    seq: int
+    history_hash: str
+
+class BatchConversation(BaseModel):
+    id: Optional[str] = None
+    messages: List[Annotated[str, Field(max_length=Config.MAX_MESSAGE_CHARS)]]  # user turns, in order
+
+def history_conflict(state: AstrologyState, reason: str) -> HTTPException:
+    """Build the 409 returned when a client's view of the history diverges"""
+    return HTTPException(status_code=409, detail={
+        "error": "history_mismatch",
+        "reason": reason,
+        "seq": state.user_turns,
+        "history_hash": state.history_hash
+    })
+
+def reconcile_user_turns(state: AstrologyState, request: ChatRequest) -> List[str]:
+    """Return the user turns in the request that the session has not stored yet"""
+    incoming = [msg.content for msg in request.messages if msg.role == "user"]
+    
+    if request.seq is None:
+        # Legacy clients resend the whole conversation; skip what we already hold
+        return incoming[state.user_turns:]
+    
+    if request.seq < 0 or request.seq > state.user_turns:
+        raise history_conflict(state, "client is ahead of the server history")
+    
+    overlap = state.user_turns - request.seq
+    if overlap == 0:
+        if request.history_hash is not None and request.history_hash != state.history_hash:
+            raise history_conflict(state, "history hash does not match")
+        return incoming
+    
+    # The client is behind (e.g. a retried turn or a resync from seq 0): the
+    # overlapping turns must match what we stored, the rest are new
+    stored = state.messages.user_contents()[request.seq:]
+    if incoming[:overlap] != stored[:len(incoming[:overlap])]:
+        raise history_conflict(state, "resent turns do not match stored history")
+    return incoming[overlap:]
+
+def get_suggestions(stage: str) -> List[str]:
+    """Quick-reply suggestions for the given conversation stage"""
+    return content_store.current().suggestions_for(stage)
+
+class RequestMetricsMiddleware:
+    """Records request latency by route template; plain ASGI to keep per-request overhead low"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Label by route template so session ids don't explode cardinality
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            metrics.REQUEST_LATENCY.observe(time.perf_counter() - started, method=scope["method"], path=path, status=str(status))
+
+app.add_middleware(RequestMetricsMiddleware)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+def groq_available() -> bool:
+    """Whether Groq is configured and its circuit breaker currently lets calls through"""
+    return GROQ_AVAILABLE and llm_client.available()
+
+# Serialized bodies for the GET endpoints, rebuilt only when their inputs change
+root_payload = PayloadCache()
+health_payload = PayloadCache(Config.HEALTH_CACHE_SECONDS)
 
 @app.get("/")
-async def root():
-    return {
+async def root(request: Request):
+    available = groq_available()
+    payload = root_payload.get((available, llm_client.breaker.state), lambda: {
         "message": "Welcome to Pandit Pradeep Kiradoo's Astrology API",
         "version": "2.0.0",
         "features": ["problem_understanding", "astrological_remedies", "planetary_analysis"],
-        "groq_available": GROQ_AVAILABLE
-    }
+        "groq_available": available,
+        "llm_circuit": llm_client.breaker.state
+    })
+    return payload_response(request, payload, "public, max-age=5")
 
 @app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy", 
+async def health_check(request: Request):
+    available = groq_available()
+    payload = health_payload.get((available, llm_client.breaker.state, metrics.COLD_START.value), lambda: {
+        # Degraded: Groq is failing and replies come from the rule-based fallback
+        "status": "healthy" if available or not GROQ_AVAILABLE else "degraded",
         "service": "astrology_chatbot_v2",
-        "groq_available": GROQ_AVAILABLE
+        "worker_pid": os.getpid(),
+        "cold_start_seconds": round(metrics.COLD_START.value, 3),
+        "slim_mode": Config.SLIM_MODE,
+        "groq_available": available,
+        "llm": llm_client.status(),
+        "ttft": ttft_summary(),
+        "response_cache": response_cache.stats() if response_cache is not None else None
+    })
+    return payload_response(request, payload, "no-cache")
+
+async def run_unless_disconnected(http_request: Request, coro) -> Any:
+    """Await ``coro``, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=Config.DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+def archived_session(session_id: str) -> Optional[AstrologyState]:
+    """Rehydrate a session from the archive; the next save puts it back in the hot store"""
+    data = archive.get(session_id) if archive is not None else None
+    if data is None:
+        return None
+    metrics.SESSIONS_REHYDRATED.inc()
+    return AstrologyState.from_dict(data)
+
+def archivable(state: AstrologyState, last_access: float) -> bool:
+    """Finished consultations after ARCHIVE_FINISHED_IDLE_SECONDS, other sessions after ARCHIVE_IDLE_SECONDS"""
+    idle = time.time() - last_access
+    return idle >= Config.ARCHIVE_IDLE_SECONDS or (state.remedies_provided and idle >= Config.ARCHIVE_FINISHED_IDLE_SECONDS)
+
+async def compact_sessions() -> int:
+    """Move one batch of finished or idle sessions to the archive; returns how many left the hot store"""
+    idle_seconds = min(Config.ARCHIVE_FINISHED_IDLE_SECONDS, Config.ARCHIVE_IDLE_SECONDS)
+    if sessions.does_io:
+        # Loading and filtering stored sessions can take a while; keep it off the event loop
+        batch = await asyncio.to_thread(sessions.idle_sessions, idle_seconds, Config.ARCHIVE_BATCH_SIZE, archivable)
+    else:
+        batch = sessions.idle_sessions(idle_seconds, Config.ARCHIVE_BATCH_SIZE, archivable)
+    if not batch:
+        return 0
+    # Serialized on the event loop, so each copy matches the version recorded with it
+    records = [(state.session_id, dumps(state.to_dict())) for state in batch]
+    versions = [(state.session_id, state.version) for state in batch]
+    await asyncio.to_thread(archive.append, records)
+    # A session touched while the batch was written stays hot; its archived copy is just older
+    moved = sum(sessions.discard(session_id, version) for session_id, version in versions)
+    metrics.SESSIONS_ARCHIVED.inc(moved)
+    return moved
+
+async def run_compaction():
+    """Compact sessions every ARCHIVE_INTERVAL_SECONDS until cancelled"""
+    while True:
+        await asyncio.sleep(Config.ARCHIVE_INTERVAL_SECONDS)
+        try:
+            started = time.perf_counter()
+            moved = total = await compact_sessions()
+            while moved >= Config.ARCHIVE_BATCH_SIZE:
+                moved = await compact_sessions()
+                total += moved
+            if total:
+                logger.info("Sessions archived", count=total, seconds=round(time.perf_counter() - started, 3))
+        except Exception:
+            logger.exception("Session compaction failed")
+
+def too_many_requests(reason: str, retry_after: float) -> HTTPException:
+    """Build the 429 returned by admission control"""
+    metrics.REJECTED.inc(reason=reason)
+    return HTTPException(status_code=429, detail={"error": "too_many_requests", "reason": reason},
+                         headers=retry_after_header(retry_after))
+
+def client_host(http_request: Request) -> str:
+    """The client address the IP rate limit is keyed on"""
+    return http_request.client.host if http_request.client else "unknown"
+
+def admit_request(http_request: Request, session_id: Optional[str] = None):
+    """Take a token from the client IP's bucket and, for an existing session, from the session's"""
+    wait = ip_limiter.acquire(client_host(http_request))
+    if wait:
+        raise too_many_requests("ip_rate", wait)
+    if session_id:
+        wait = session_limiter.acquire(session_id)
+        if wait:
+            raise too_many_requests("session_rate", wait)
+
+def idempotency_key(http_request: Request) -> Optional[str]:
+    """The request's Idempotency-Key header, if it sent one"""
+    key = http_request.headers.get("idempotency-key")
+    if key is not None and not 0 < len(key) <= 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be 1 to 255 characters")
+    return key
+
+async def lock_session(request: ChatRequest, key: Optional[str]) -> Optional[SessionLease]:
+    """Wait until no other turn of the session is in progress in this worker"""
+    if not request.session_id and key is not None:
+        request.session_id = created_sessions.get(key)
+    lock_key = request.session_id or (f"idempotency:{key}" if key is not None else None)
+    if lock_key is None:
+        # A new session that no other request can address yet
+        return None
+    try:
+        return await session_locks.acquire(lock_key, Config.SESSION_LOCK_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        metrics.REJECTED.inc(reason="session_busy")
+        raise HTTPException(status_code=409, detail={
+            "error": "turn_in_progress",
+            "reason": "another request for this session is still being answered"
+        }, headers=retry_after_header(1))
+
+def release_turn(*handles: Any):
+    """Release the in-flight slot and session lock held for a turn"""
+    for handle in handles:
+        if handle is not None:
+            handle.release()
+
+def open_turn(request: ChatRequest, idempotency_key: Optional[str] = None) -> Tuple[AstrologyState, bool, Optional[InFlightSlot]]:
+    """Get or create the session and append the request's new user turns.
+    
+    Returns the session state, whether a reply needs to be generated (when
+    nothing new arrived, or ``idempotency_key`` already has a stored reply,
+    that reply should be replayed) and the in-flight slot held for an LLM
+    reply, which the caller must release. Call with the session's lock held.
+    """
+    if not request.session_id and idempotency_key is not None:
+        # A retried first turn that waited for the original to finish
+        request.session_id = created_sessions.get(idempotency_key)
+    
+    # Get the session (back from the archive if it was compacted) or create it
+    state = (sessions.get(request.session_id) or archived_session(request.session_id)) if request.session_id else None
+    if state is None:
+        state = AstrologyState()
+        state.session_id = request.session_id or sessions.new_session_id()
+        if idempotency_key is not None:
+            created_sessions[idempotency_key] = state.session_id
+            if len(created_sessions) > Config.MAX_SESSIONS:
+                created_sessions.popitem(last=False)
+    current_session_id.set(state.session_id)
+    
+    turn = state.idempotency_keys.get(idempotency_key) if idempotency_key is not None else None
+    if turn is not None:
+        incoming = [msg.content for msg in request.messages if msg.role == "user"]
+        if incoming and incoming[-1] != state.messages[turn[0] - 1].content:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different turn")
+        # A retried turn: replay the reply it got instead of calling the LLM again
+        return state, False, None
+    
+    # Append only the user turns the session has not seen yet
+    new_turns = reconcile_user_turns(state, request)
+    if not new_turns and state.messages and state.messages[-1].role == "assistant":
+        # Nothing new (e.g. a retried request): don't generate and store another reply
+        return state, False, None
+    
+    user_turns = state.user_turns + len(new_turns)
+    if user_turns > Config.MAX_SESSION_TURNS:
+        metrics.REJECTED.inc(reason="session_turns")
+        raise HTTPException(status_code=422, detail=f"Sessions are limited to {Config.MAX_SESSION_TURNS} user turns")
+    
+    # Reserve the LLM slot before touching the session, so a rejected turn leaves no trace
+    slot = None
+    if uses_llm(stage_for_user_count(user_turns)):
+        slot = llm_inflight.try_acquire()
+        if slot is None:
+            raise too_many_requests("llm_inflight", llm_inflight.retry_after_seconds)
+    for content in new_turns:
+        state.add_user_turn(content)
+    
+    # Determine current stage
+    state.current_stage = determine_stage(state.messages)
+    try:
+        sessions.save(state)
+    except BaseException as e:
+        # The caller never gets the slot back, so free it whatever the store raised
+        release_turn(slot)
+        if isinstance(e, SessionConflict):
+            raise session_changed(state)
+        raise
+    return state, True, slot
+
+def session_changed(state: AstrologyState) -> HTTPException:
+    """409 for a session another worker saved since ``state`` was loaded"""
+    return history_conflict(sessions.get(state.session_id) or state, "session was changed by a concurrent request")
+
+def apply_reply(state: AstrologyState, ai_response: str):
+    """Append the assistant reply for the current stage"""
+    state.messages.append(ASSISTANT, ai_response)
+    
+    # If we're in analysis stage, mark that remedies have been provided
+    if state.current_stage == "analysis":
+        state.remedies_provided = True
+
+def remember_idempotency_key(state: AstrologyState, key: str):
+    """Record that the last reply answered ``key``, keeping the newest IDEMPOTENCY_KEYS_PER_SESSION keys"""
+    state.idempotency_keys[key] = [len(state.messages) - 1, state.user_turns, state.history_hash, state.current_stage]
+    while len(state.idempotency_keys) > Config.IDEMPOTENCY_KEYS_PER_SESSION:
+        del state.idempotency_keys[next(iter(state.idempotency_keys))]
+
+def close_turn(state: AstrologyState, ai_response: str, idempotency_key: Optional[str] = None) -> AstrologyState:
+    """Store the assistant reply for the current stage.
+    
+    Returns the state holding the reply: if another worker answered the same
+    turn first, its reply is kept. Raises 409 if the session moved on.
+    """
+    apply_reply(state, ai_response)
+    if idempotency_key is not None:
+        remember_idempotency_key(state, idempotency_key)
+    try:
+        sessions.save(state)
+    except SessionConflict:
+        stored = sessions.get(state.session_id)
+        if (stored is not None and stored.user_turns == state.user_turns and stored.history_hash == state.history_hash
+                and stored.messages[-1].role == "assistant"):
+            return stored
+        raise session_changed(state)
+    return state
+
+def chat_response_data(state: AstrologyState, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    """ChatResponse fields for the last stored assistant reply of a session,
+    or for the earlier turn ``idempotency_key`` answered.
+    
+    Built as a plain dict and serialized directly: the fields come from
+    server state, so validating them through the model again is skipped.
+    """
+    turn = state.idempotency_keys.get(idempotency_key) if idempotency_key is not None else None
+    if turn is None:
+        turn = (len(state.messages) - 1, state.user_turns, state.history_hash, state.current_stage)
+    index, seq, history_hash, stage = turn
+    return {
+        "message": state.messages[index].content,
+        "session_id": state.session_id,
+        "stage": stage,
+        "suggestions": get_suggestions(stage),
+        "seq": seq,
+        "history_hash": history_hash
     }
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_with_pandit(request: ChatRequest):
+async def chat_with_pandit(request: ChatRequest, http_request: Request):
+    started = time.perf_counter()
+    slot = lease = None
     try:
-        # Get or create session
-        session_id = request.session_id or f"session_{len(sessions) + 1}"
-        if session_id not in sessions:
-            sessions[session_id] = AstrologyState()
-            sessions[session_id].session_id = session_id
+        admit_request(http_request, request.session_id)
+        key = idempotency_key(http_request)
+        lease = await lock_session(request, key)
+        state, needs_reply, slot = open_turn(request, key)
         
-        state = sessions[session_id]
-        
-        # Add user messages to state
-        for msg in request.messages:
-            if msg.role == "user":
-                state.messages.append({
-                    "role": "user",
-                    "content": msg.content,
-                    "timestamp": datetime.now().isoformat()
-                })
-        
-        # Determine current stage
-        current_stage = determine_stage(state.messages)
-        state.current_stage = current_stage
-        
-        # Get AI response
-        ai_response = get_ai_response(state.messages, current_stage)
-        
-        # Add AI response to state
-        state.messages.append({
-            "role": "assistant",
-            "content": ai_response,
-            "timestamp": datetime.now().isoformat()
-        })
+        if needs_reply:
+            # Get AI response; abandon the LLM call if the client goes away
+            ai_response = await run_unless_disconnected(http_request, get_ai_response(state.messages, state.current_stage, state.summary))
+            state = close_turn(state, ai_response, key)
         
-        # If we're in analysis stage, mark that remedies have been provided
-        if current_stage == "analysis":
-            state.remedies_provided = True
-        
-        # Generate suggestions based on stage
-        suggestions = []
-        if current_stage == "greeting":
-            suggestions = [
-                "I'm having career-related issues",
-                "I'm facing problems in my relationships",
-                "I'm experiencing financial difficulties",
-                "I have health concerns"
-            ]
-        elif current_stage == "question_1":
-            suggestions = [
-                "A few weeks",
-                "Several months",
-                "Over a year",
-                "Just recently started"
-            ]
-        elif current_stage == "question_2":
-            suggestions = [
-                "Affects my work performance",
-                "Impacts my relationships",
-                "Affects my health",
-                "Affects my sleep"
-            ]
-        elif current_stage == "question_3":
-            suggestions = [
-                "I've tried meditation",
-                "I've prayed and done puja",
-                "I've consulted doctors",
-                "I've tried changing my routine"
-            ]
-        elif current_stage == "question_4":
-            suggestions = [
-                "I feel stressed and anxious",
-                "I feel frustrated and angry",
-                "I feel hopeless",
-                "I feel confused"
-            ]
-        elif current_stage == "question_5":
-            suggestions = [
-                "Recurring arguments",
-                "Sleep problems",
-                "Loss of appetite",
-                "Difficulty concentrating"
-            ]
-        elif current_stage == "analysis":
-            suggestions = [
-                "Thank you for the remedies",
-                "How long should I follow these?",
-                "Can you explain more about the mantras?",
-                "Thank you, I'll start following these"
-            ]
-        else:
-            suggestions = [
-                "Thank you for your guidance",
-                "I have another question",
-                "Can you help with something else?",
-                "Thank you, that's all I needed"
-            ]
-        
-        return ChatResponse(
-            message=ai_response,
-            session_id=session_id,
-            stage=current_stage,
-            suggestions=suggestions[:4]
-        )
+        elapsed = time.perf_counter() - started
+        metrics.STAGE_LATENCY.observe(elapsed, endpoint="chat", stage=state.current_stage)
+        logger.info("Chat turn handled", stage=state.current_stage, replayed=not needs_reply, latency_ms=round(elapsed * 1000, 1))
+        return JSONBytesResponse(dumps(chat_response_data(state, key)))
         
+    except HTTPException:
+        raise
+    except ClientDisconnected:
+        # Nobody is listening; the stored user turn is answered on retry
+        return Response(status_code=499)
+    except SessionStoreBusy:
+        raise session_store_busy()
+    except Exception as e:
+        logger.exception("Error in chat endpoint")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        release_turn(slot, lease)
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+def record_ttft(stage: str, ttft: float):
+    """Keep a time-to-first-token sample for perceived latency tracking"""
+    ttft_samples.append(ttft)
+    metrics.TTFT.observe(ttft, stage=stage)
+    logger.info("First token streamed", stage=stage, ttft_ms=round(ttft * 1000, 1))
+
+def ttft_summary() -> Dict[str, Any]:
+    """Percentiles of recent time-to-first-token samples in milliseconds"""
+    samples = sorted(ttft_samples)
+    if not samples:
+        return {"samples": 0}
+    pick = lambda q: round(samples[min(int(q * len(samples)), len(samples) - 1)] * 1000, 1)
+    return {"samples": len(samples), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+async def iterate_chunks(chunks: List[str]) -> AsyncIterator[str]:
+    for chunk in chunks:
+        yield chunk
+
+@app.post("/chat/stream")
+async def chat_with_pandit_stream(request: ChatRequest, http_request: Request):
+    """Stream the reply as Server-Sent Events.
+    
+    Emits ``token`` events with text chunks followed by a trailing ``done``
+    event carrying the stage, suggestions and delta protocol fields, or by
+    an ``error`` event when the reply could not be completed and stored.
+    """
+    started = time.perf_counter()
+    slot = lease = None
+    try:
+        admit_request(http_request, request.session_id)
+        key = idempotency_key(http_request)
+        lease = await lock_session(request, key)
+        state, needs_reply, slot = open_turn(request, key)
+    except HTTPException:
+        release_turn(slot, lease)
+        raise
+    except SessionStoreBusy:
+        release_turn(slot, lease)
+        raise session_store_busy()
     except Exception as e:
-        print(f"Error in chat endpoint: {e}")
+        release_turn(slot, lease)
+        logger.exception("Error in chat stream endpoint")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    if needs_reply:
+        chunks = stream_ai_response(state.messages, state.current_stage, state.summary)
+    else:
+        chunks = iterate_chunks(chunk_text(chat_response_data(state, key)["message"]))
+    
+    async def events() -> AsyncIterator[str]:
+        nonlocal state
+        parts = []
+        try:
+            try:
+                async for chunk in chunks:
+                    if not parts:
+                        record_ttft(state.current_stage, time.perf_counter() - started)
+                    parts.append(chunk)
+                    yield sse_event("token", {"text": chunk})
+            except ReplyInterrupted:
+                # Leave the user turn unanswered so a retry generates the reply again
+                yield sse_event("error", {"status": 502, "detail": "The reply was interrupted, please retry"})
+                return
+            
+            # Only a fully delivered reply becomes part of the history
+            if needs_reply:
+                try:
+                    state = close_turn(state, "".join(parts), key)
+                except HTTPException as e:
+                    # Another worker moved the session on while this reply streamed
+                    yield sse_event("error", {"status": e.status_code, "detail": e.detail})
+                    return
+                except SessionStoreBusy:
+                    error = session_store_busy()
+                    yield sse_event("error", {"status": error.status_code, "detail": error.detail})
+                    return
+            metrics.STAGE_LATENCY.observe(time.perf_counter() - started, endpoint="chat_stream", stage=state.current_stage)
+            done = chat_response_data(state, key)
+            del done["message"]
+            yield sse_event("done", done)
+        finally:
+            release_turn(slot, lease)
+    
+    # The background task frees the slot and lock if the stream is dropped before it starts
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"},
+                             background=BackgroundTask(release_turn, slot, lease))
+
+async def iterate_items(items: Union[Iterable[Any], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+def parse_batch_conversation(item: Any) -> BatchConversation:
+    if isinstance(item, BatchConversation):
+        return item
+    if isinstance(item, (str, bytes)):
+        return BatchConversation.model_validate_json(item)
+    return BatchConversation.model_validate(item)
+
+def batch_rejected(index: int, conversation_id: Optional[str], reason: str, retry_after: float,
+                   turns: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Result for a batch conversation turned away by admission control"""
+    metrics.REJECTED.inc(reason=reason)
+    return {"index": index, "id": conversation_id, "turns": turns or [], "error": "too_many_requests", "reason": reason,
+            "retry_after": max(1, math.ceil(retry_after))}
+
+async def run_batch_conversation(index: int, conversation: BatchConversation) -> Dict[str, Any]:
+    """Replay one scripted conversation through the chat pipeline without storing it.
+    
+    LLM turns take a slot under the same LLM_MAX_INFLIGHT cap as interactive
+    turns; when none is free the conversation stops there and is rejected.
+    """
+    state = AstrologyState()
+    state.session_id = conversation.id or sessions.new_session_id()
+    current_session_id.set(state.session_id)
+    turns = []
+    try:
+        for content in conversation.messages:
+            state.add_user_turn(content)
+            state.current_stage = determine_stage(state.messages)
+            slot = None
+            if uses_llm(state.current_stage):
+                slot = llm_inflight.try_acquire()
+                if slot is None:
+                    return batch_rejected(index, state.session_id, "llm_inflight", llm_inflight.retry_after_seconds, turns)
+            try:
+                ai_response = await get_ai_response(state.messages, state.current_stage, state.summary)
+            finally:
+                release_turn(slot)
+            apply_reply(state, ai_response)
+            turns.append({"stage": state.current_stage, "message": ai_response, "suggestions": get_suggestions(state.current_stage)})
+    except Exception as e:
+        logger.exception("Batch conversation failed", index=index)
+        return {"index": index, "id": state.session_id, "turns": turns, "error": str(e)}
+    return {"index": index, "id": state.session_id, "turns": turns, "remedies_provided": state.remedies_provided}
+
+async def run_batch(conversations: Union[Iterable[Any], AsyncIterator[Any]], concurrency: Optional[int] = None,
+                    client: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Run many scripted conversations, yielding one result per conversation as it completes.
+    
+    ``conversations`` may be a sync or async iterable of BatchConversation,
+    dicts or JSON strings and is consumed lazily, so memory stays bounded by
+    the number of conversations in flight. Conversations whose turns are all
+    rule-based are answered inline; those with LLM turns run in a pool of
+    ``concurrency`` tasks. Results carry the input ``index`` since they can
+    complete out of order. With ``client`` set, each conversation with LLM
+    turns takes a token from that client's IP bucket.
+    """
+    limit = max(1, min(concurrency or Config.BATCH_CONCURRENCY, Config.BATCH_CONCURRENCY))
+    pending = set()
+    try:
+        index = -1
+        async for item in iterate_items(conversations):
+            index += 1
+            try:
+                conversation = parse_batch_conversation(item)
+            except ValidationError as e:
+                yield {"index": index, "error": "invalid conversation: " + "; ".join(error["msg"] for error in e.errors())}
+                continue
+            if len(conversation.messages) > Config.BATCH_MAX_TURNS:
+                yield {"index": index, "id": conversation.id, "error": f"more than {Config.BATCH_MAX_TURNS} turns"}
+                continue
+            
+            stages = [stage_for_user_count(count) for count in range(1, len(conversation.messages) + 1)]
+            if not any(uses_llm(stage) for stage in stages):
+                # Nothing to wait on: no pool slot needed
+                yield await run_batch_conversation(index, conversation)
+                continue
+            
+            if len(pending) >= limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            if client is not None:
+                wait = ip_limiter.acquire(client)
+                if wait:
+                    yield batch_rejected(index, conversation.id, "ip_rate", wait)
+                    continue
+            pending.add(asyncio.ensure_future(run_batch_conversation(index, conversation)))
+        
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+def iterate_ndjson_lines(body: bytes) -> Iterable[bytes]:
+    """Non-empty lines of an NDJSON body, split lazily"""
+    start = 0
+    while start < len(body):
+        end = body.find(b"\n", start)
+        if end < 0:
+            end = len(body)
+        line = body[start:end]
+        start = end + 1
+        if line.strip():
+            yield line
+
+@app.post("/chat/batch")
+async def chat_batch(http_request: Request, concurrency: Optional[int] = None):
+    """Run scripted conversations in bulk, streaming results back as NDJSON.
+    
+    Accepts ``application/x-ndjson`` (one conversation per line, parsed as
+    the pool frees up) or JSON ``{"conversations": [...]}``. The body is read
+    up front because the streaming response owns the connection afterwards.
+    Sessions are not stored. Each conversation with LLM turns is charged to
+    the client IP's rate limit and its turns count against LLM_MAX_INFLIGHT,
+    so a batch can't crowd out interactive chats.
+    """
+    admit_request(http_request)
+    if http_request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        conversations = iterate_ndjson_lines(await http_request.body())
+    else:
+        try:
+            body = await http_request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be NDJSON or JSON")
+        if not isinstance(body, dict) or not isinstance(body.get("conversations"), list):
+            raise HTTPException(status_code=400, detail='Expected {"conversations": [...]}')
+        conversations = body["conversations"]
+    
+    async def lines() -> AsyncIterator[bytes]:
+        async for result in run_batch(conversations, concurrency, client_host(http_request)):
+            yield dumps(result) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @app.get("/session/{session_id}")
-async def get_session(session_id: str):
-    """Get session information"""
-    if session_id in sessions:
-        state = sessions[session_id]
-        return {
+async def get_session(session_id: str, request: Request):
+    """Get session information, reading compacted sessions from the archive"""
+    state = sessions.get(session_id)
+    archived = state is None
+    if archived:
+        state = archived_session(session_id)
+    if state is not None:
+        payload = PreparedPayload({
             "session_id": session_id,
             "message_count": len(state.messages),
+            "seq": state.user_turns,
+            "history_hash": state.history_hash,
             "stage": state.current_stage,
             "problem_understood": state.problem_understood,
-            "remedies_provided": state.remedies_provided
-        }
+            "remedies_provided": state.remedies_provided,
+            "archived": archived
+        })
+        return payload_response(request, payload, "private, no-cache")
     else:
         raise HTTPException(status_code=404, detail="Session not found")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=Config.HOST, port=Config.PORT)
+    if Config.WORKERS > 1:
+        # Workers import the app themselves; sessions live in the shared store
+        uvicorn.run("main:app", host=Config.HOST, port=Config.PORT, workers=Config.WORKERS,
+                    app_dir=os.path.dirname(os.path.abspath(__file__)),
+                    proxy_headers=True, forwarded_allow_ips=Config.FORWARDED_ALLOW_IPS)
+    else:
+        uvicorn.run(app, host=Config.HOST, port=Config.PORT,
+                    proxy_headers=True, forwarded_allow_ips=Config.FORWARDED_ALLOW_IPS)
@@ -0,0 +1,104 @@
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+# Roles are stored as one byte per message
+USER = 0
+ASSISTANT = 1
+ROLE_NAMES = ("user", "assistant")
+ROLE_CODES = {name: code for code, name in enumerate(ROLE_NAMES)}
+
+
+class Message:
+    """Read-only view of one entry in a MessageLog"""
+
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role: str, content: str, timestamp: int):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content[:30]!r}, timestamp={self.timestamp})"
+
+
+class MessageLog:
+    """Append-only, columnar conversation history.
+
+    Roles live in a bytearray, timestamps (epoch seconds) in an int array and
+    contents in a plain list, so a turn costs a few bytes of bookkeeping
+    instead of a dict with an ISO timestamp string. The number of user turns
+    is maintained on append.
+    """
+
+    __slots__ = ("_roles", "_contents", "_timestamps", "_tokens", "user_count")
+
+    def __init__(self):
+        self._roles = bytearray()
+        self._contents: List[str] = []
+        self._timestamps = array("q")
+        # Token count per message, computed on first use (-1 = not yet counted)
+        self._tokens = array("i")
+        self.user_count = 0
+
+    def append(self, role: int, content: str, timestamp: Optional[int] = None, tokens: int = -1):
+        self._roles.append(role)
+        self._contents.append(content)
+        self._timestamps.append(int(time.time()) if timestamp is None else timestamp)
+        self._tokens.append(tokens)
+        if role == USER:
+            self.user_count += 1
+
+    def _message(self, index: int) -> Message:
+        return Message(ROLE_NAMES[self._roles[index]], self._contents[index], self._timestamps[index])
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def __bool__(self) -> bool:
+        return bool(self._contents)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, List[Message]]:
+        if isinstance(index, slice):
+            return [self._message(i) for i in range(*index.indices(len(self._contents)))]
+        if index < 0:
+            index += len(self._contents)
+        if not 0 <= index < len(self._contents):
+            raise IndexError("message index out of range")
+        return self._message(index)
+
+    def __iter__(self) -> Iterator[Message]:
+        for i in range(len(self._contents)):
+            yield self._message(i)
+
+    def token_count(self, index: int, counter: Callable[[str], int]) -> int:
+        """Token count of one message, cached after the first call"""
+        tokens = self._tokens[index]
+        if tokens < 0:
+            tokens = self._tokens[index] = counter(self._contents[index])
+        return tokens
+
+    def user_contents(self) -> List[str]:
+        """Contents of the user turns, oldest first"""
+        return [content for role, content in zip(self._roles, self._contents) if role == USER]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        entries = []
+        for role, content, timestamp, tokens in zip(self._roles, self._contents, self._timestamps, self._tokens):
+            entry = {"role": ROLE_NAMES[role], "content": content, "timestamp": timestamp}
+            if tokens >= 0:
+                # Kept with the message so a session loaded from a shared store isn't recounted
+                entry["tokens"] = tokens
+            entries.append(entry)
+        return entries
+
+    @classmethod
+    def from_list(cls, entries: List[Dict[str, Any]]) -> "MessageLog":
+        log = cls()
+        for entry in entries:
+            timestamp = entry.get("timestamp")
+            tokens = entry.get("tokens")
+            log.append(ROLE_CODES[entry["role"]], entry["content"], timestamp if isinstance(timestamp, int) else None,
+                       tokens if isinstance(tokens, int) else -1)
+        return log
@@ -0,0 +1,183 @@
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits to slow LLM completions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(_escape(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """Gauge holding a set value, or read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text)
+        self.read = read
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {self.read() if self.read is not None else self.value}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total[0]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def resident_memory_bytes() -> float:
+    """Resident set size of this process (Linux), 0 when unavailable"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return float(int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+    except (OSError, ValueError):
+        return 0.0
+
+
+def process_start_time() -> float:
+    """Unix time this process started (Linux), falling back to module import time"""
+    try:
+        with open("/proc/self/stat") as stat:
+            # Field 22, counted after the parenthesized command name
+            start_ticks = int(stat.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as proc_stat:
+            boot_time = next(int(line.split()[1]) for line in proc_stat if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return _IMPORTED_AT
+
+
+_IMPORTED_AT = time.time()
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "path", "status"]))
+STAGE_LATENCY = registry.register(Histogram(
+    "chat_stage_duration_seconds", "Chat turn latency per consultation stage", ["endpoint", "stage"]))
+TTFT = registry.register(Histogram(
+    "chat_time_to_first_token_seconds", "Time to first streamed token per stage", ["stage"]))
+LLM_LATENCY = registry.register(Histogram(
+    "llm_request_duration_seconds", "Groq call latency", ["outcome"]))
+LLM_ERRORS = registry.register(Counter(
+    "llm_errors_total", "Groq calls that failed, by exception type", ["error"]))
+LLM_RETRIES = registry.register(Counter(
+    "llm_retries_total", "Groq calls retried after a failed attempt, by exception type", ["error"]))
+LLM_HEDGES = registry.register(Counter(
+    "llm_hedged_requests_total", "Hedged requests sent to the secondary model and won by it", ["outcome"]))
+LLM_SHORT_CIRCUITS = registry.register(Counter(
+    "llm_short_circuited_total", "Calls answered by the fallback because the circuit breaker was open"))
+RESPONSES = registry.register(Counter(
+    "chat_responses_total", "Replies by source (llm, cache, fallback, rule)", ["source"]))
+REJECTED = registry.register(Counter(
+    "requests_rejected_total", "Requests turned away by admission control", ["reason"]))
+SESSIONS_ARCHIVED = registry.register(Counter(
+    "sessions_archived_total", "Sessions moved from the hot store to the archive"))
+SESSIONS_REHYDRATED = registry.register(Counter(
+    "sessions_rehydrated_total", "Sessions read back from the archive"))
+PROMPT_TOKENS = registry.register(Histogram(
+    "llm_prompt_tokens", "History tokens sent per LLM call", buckets=(100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000)))
+registry.register(Gauge("process_resident_memory_bytes", "Resident memory of this worker", resident_memory_bytes))
+COLD_START = registry.register(Gauge(
+    "app_cold_start_seconds", "Time from process start until the app was ready to serve"))
+LLM_INIT = registry.register(Gauge(
+    "llm_client_init_seconds", "Time to import and build the Groq client on first use (0 until then)"))
+
+
+def register_gauge(name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+    return registry.register(Gauge(name, help_text, read))
@@ -0,0 +1,138 @@
+import hashlib
+import itertools
+import math
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from message_log import MessageLog
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    """Case, punctuation and whitespace insensitive form of a message"""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def embed(text: str) -> Dict[int, float]:
+    """Local embedding: unit-length hashed character-trigram counts"""
+    padded = f"  {text} "
+    vector: Dict[int, float] = {}
+    for i in range(len(padded) - 2):
+        feature = zlib.crc32(padded[i:i + 3].encode("utf-8")) & 0xFFFFF
+        vector[feature] = vector.get(feature, 0.0) + 1.0
+    norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+    return {feature: value / norm for feature, value in vector.items()}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(feature, 0.0) for feature, value in a.items())
+
+
+class ResponseCache:
+    """LLM response cache with an exact tier and an optional similarity tier.
+
+    Entries are keyed on the stage, the normalized last ``context_messages``
+    messages and a fingerprint of the prompt and model parameters, so a prompt
+    or model change never serves stale answers. The similarity tier (enabled
+    with a threshold above 0) compares trigram embeddings of the context
+    against recent entries for the same stage. Both tiers share LRU/TTL
+    eviction and the ``max_entries`` cap.
+    """
+
+    def __init__(self, fingerprint: str, max_entries: int, ttl_seconds: float,
+                 context_messages: int, similarity_threshold: float = 0.0, similarity_scan: int = 256):
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.context_messages = context_messages
+        self.similarity_threshold = similarity_threshold
+        self.similarity_scan = similarity_scan
+        # key -> (response, stored_at, stage)
+        self._entries: "OrderedDict[str, Tuple[str, float, str]]" = OrderedDict()
+        # stage -> key -> embedding, most recent last
+        self._vectors: Dict[str, "OrderedDict[str, Dict[int, float]]"] = {}
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _context(self, messages: MessageLog) -> str:
+        window = messages[-self.context_messages:] if self.context_messages else []
+        return "\n".join(f"{msg.role}:{normalize(msg.content)}" for msg in window)
+
+    def _key(self, stage: str, context: str) -> str:
+        return hashlib.sha256(f"{self.fingerprint}\x1f{stage}\x1f{context}".encode("utf-8")).hexdigest()
+
+    def _drop(self, key: str):
+        _, _, stage = self._entries.pop(key)
+        self._vectors.get(stage, {}).pop(key, None)
+
+    def _lookup(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl_seconds:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get(self, stage: str, messages: MessageLog) -> Optional[str]:
+        now = time.time()
+        context = self._context(messages)
+        response = self._lookup(self._key(stage, context), now)
+        if response is not None:
+            self.hits += 1
+            return response
+
+        if self.similarity_threshold > 0:
+            query = embed(context)
+            best_key, best_score = None, self.similarity_threshold
+            candidates = self._vectors.get(stage, {})
+            for key in itertools.islice(reversed(candidates), self.similarity_scan):
+                score = cosine(query, candidates[key])
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is not None:
+                response = self._lookup(best_key, now)
+                if response is not None:
+                    self.similar_hits += 1
+                    return response
+
+        self.misses += 1
+        return None
+
+    def put(self, stage: str, messages: MessageLog, response: str):
+        now = time.time()
+        context = self._context(messages)
+        key = self._key(stage, context)
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (response, now, stage)
+        if self.similarity_threshold > 0:
+            self._vectors.setdefault(stage, OrderedDict())[key] = embed(context)
+
+        # Oldest entries sit at the front; drop expired ones and enforce the cap
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if now - self._entries[oldest][1] <= self.ttl_seconds and len(self._entries) <= self.max_entries:
+                break
+            self._drop(oldest)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.similar_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.similar_hits) / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import time
+from typing import Any, Callable, Hashable, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Optional fast JSON encoder; the standard library is used when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class JSONBytesResponse(Response):
+    """JSON response whose body is already serialized"""
+
+    media_type = "application/json"
+
+
+class PreparedPayload:
+    """A JSON body serialized once, with its strong ETag"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, data: Any):
+        self.body = dumps(data)
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=8).hexdigest()}"'
+
+
+class PayloadCache:
+    """Keeps the payload built for the latest ``key``, rebuilding it when the key changes or it expires"""
+
+    def __init__(self, ttl_seconds: float = float("inf")):
+        self.ttl_seconds = ttl_seconds
+        self._key: Optional[Hashable] = None
+        self._payload: Optional[PreparedPayload] = None
+        self._built_at = 0.0
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> PreparedPayload:
+        now = time.monotonic()
+        if self._payload is None or key != self._key or now - self._built_at > self.ttl_seconds:
+            self._payload = PreparedPayload(build())
+            self._key = key
+            self._built_at = now
+        return self._payload
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def conditional_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """200 with ``body``, or 304 when the client already holds ``etag``"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONBytesResponse(body, headers=headers)
+
+
+def payload_response(request: Request, payload: PreparedPayload, cache_control: str) -> Response:
+    return conditional_response(request, payload.body, payload.etag, cache_control)
@@ -0,0 +1,191 @@
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from logging_setup import get_logger
+
+# Optional zstd codec; archives fall back to gzip when it is not installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Optional cross-process lock so workers never interleave writes to a segment
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = get_logger("archive")
+
+EXTENSIONS = {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz"}
+
+
+def compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("reading zstd archive segments requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def segment_codec(segment: str) -> str:
+    return "zstd" if segment.endswith(EXTENSIONS["zstd"]) else "gzip"
+
+
+class SessionArchive:
+    """Append-only, compressed archive of sessions moved out of the hot store.
+
+    Sessions are written as JSON lines to numbered segment files. Each
+    ``append`` adds one compressed frame (a zstd frame or gzip member), so a
+    segment is a valid multi-frame stream that standard tools can read end
+    to end. A SQLite index maps each session id to the frame holding its
+    latest copy, so a single session is rehydrated by reading one frame.
+    Segments roll over once they pass ``segment_bytes``.
+    """
+
+    def __init__(self, directory: str, codec: str = "zstd", segment_bytes: int = 64 * 1024 * 1024):
+        if codec not in EXTENSIONS:
+            raise ValueError(f"Unknown ARCHIVE_COMPRESSION: {codec}")
+        if codec == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, archiving with gzip")
+            codec = "gzip"
+        self.directory = directory
+        self.codec = codec
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        index_path = os.path.join(directory, "index.db")
+        self._conn = sqlite3.connect(index_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS archived ("
+            "session_id TEXT PRIMARY KEY, segment TEXT NOT NULL, offset INTEGER NOT NULL, "
+            "length INTEGER NOT NULL, archived_at REAL NOT NULL)"
+        )
+        # Lookups run on the event loop: they get their own connection and lock,
+        # and WAL readers never wait on a writer's fsync
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(index_path, timeout=30, check_same_thread=False, isolation_level=None)
+
+    def segments(self) -> List[str]:
+        """Segment file names, oldest first"""
+        return sorted(name for name in os.listdir(self.directory) if name.startswith("segment-"))
+
+    def _current_segment(self) -> str:
+        segments = self.segments()
+        if segments:
+            last = segments[-1]
+            if last.endswith(EXTENSIONS[self.codec]) and os.path.getsize(os.path.join(self.directory, last)) < self.segment_bytes:
+                return last
+        number = int(segments[-1][len("segment-"):].split(".")[0]) + 1 if segments else 1
+        return f"segment-{number:06d}{EXTENSIONS[self.codec]}"
+
+    def append(self, records: List[Tuple[str, bytes]]) -> int:
+        """Write ``(session_id, json_bytes)`` records as one frame; returns the number written.
+
+        Blocking: call it from a worker thread.
+        """
+        if not records:
+            return 0
+        frame = compress(self.codec, b"".join(data + b"\n" for _, data in records))
+        with self._lock, self._exclusive():
+            segment = self._current_segment()
+            with open(os.path.join(self.directory, segment), "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(frame)
+                f.flush()
+                os.fsync(f.fileno())
+            # Index only after the frame is on disk; a crash in between leaves unreferenced bytes
+            now = time.time()
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO archived (session_id, segment, offset, length, archived_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(session_id, segment, offset, len(frame), now) for session_id, _ in records]
+                )
+        return len(records)
+
+    def _exclusive(self):
+        return _FileLock(os.path.join(self.directory, "archive.lock"))
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """The latest archived copy of a session, or None"""
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT segment, offset, length FROM archived WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        segment, offset, length = row
+        with open(os.path.join(self.directory, segment), "rb") as f:
+            f.seek(offset)
+            frame = f.read(length)
+        # The frame holds a batch of sessions; the needle skips parsing the others
+        needle = json.dumps(session_id).encode("utf-8")
+        for line in decompress(segment_codec(segment), frame).splitlines():
+            if needle in line:
+                data = json.loads(line)
+                if data.get("session_id") == session_id:
+                    return data
+        return None
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._read_lock:
+            return self._reader.execute("SELECT 1 FROM archived WHERE session_id = ?", (session_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._read_lock:
+            return self._reader.execute("SELECT COUNT(*) FROM archived").fetchone()[0]
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Every archived copy in write order, for analytics; a session archived twice appears twice"""
+        for segment in self.segments():
+            with open(os.path.join(self.directory, segment), "rb") as f:
+                if segment_codec(segment) == "zstd":
+                    if zstandard is None:
+                        raise RuntimeError("reading zstd archive segments requires the zstandard package")
+                    stream = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+                else:
+                    stream = gzip.GzipFile(fileobj=f)
+                with stream:
+                    pending = b""
+                    while True:
+                        chunk = stream.read(1 << 20)
+                        if not chunk:
+                            break
+                        lines = (pending + chunk).split(b"\n")
+                        pending = lines.pop()
+                        for line in lines:
+                            if line:
+                                yield json.loads(line)
+
+
+class _FileLock:
+    """Exclusive flock on a file, held across worker processes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self.path, "a")
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
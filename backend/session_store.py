@@ -0,0 +1,456 @@
+import asyncio
+import json
+import math
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+
+# Optional client for the redis backend
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class SessionConflict(Exception):
+    """Raised by ``save`` when the stored session changed after it was loaded"""
+
+
+class SessionStoreBusy(Exception):
+    """Raised when the backend cannot serve a call in time, e.g. SQLite stays locked by another worker or Redis is unreachable"""
+
+
+class SessionStore:
+    """Interface for session persistence backends.
+
+    Stores hold objects with ``session_id`` and ``version`` attributes. ``get``
+    returns the live session (refreshing its idle timer) and ``save`` must be
+    called after every mutation so backends that keep a serialized copy see
+    the change. ``save`` bumps ``version``; shared backends only write over
+    the version the state was loaded with and raise SessionConflict when
+    another worker saved the session in between.
+    """
+
+    # Whether calls do I/O; long scans of such stores belong in a worker thread
+    does_io = True
+
+    def get(self, session_id: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def save(self, state: Any) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def idle_sessions(self, idle_seconds: float, limit: int,
+                      select: Callable[[Any, float], bool] = lambda state, last_access: True) -> List[Any]:
+        """Up to ``limit`` sessions idle for ``idle_seconds`` that ``select(state, last_access)`` accepts,
+        least recently used first, without refreshing their idle timers"""
+        raise NotImplementedError
+
+    def discard(self, session_id: str, version: int) -> bool:
+        """Delete the session only if it is still at ``version``; returns whether it was deleted"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def new_session_id(self) -> str:
+        """Collision-safe session id, unique across evictions and workers"""
+        return f"session_{uuid.uuid4().hex}"
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store with LRU eviction and an idle TTL"""
+
+    # Sessions are live objects, so scans must stay on the event loop that mutates them
+    does_io = False
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        # session_id -> (state, last_access), least recently used first
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _evict(self, now: float):
+        # Entries are ordered by last access, so expired ones sit at the front
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def get(self, session_id: str) -> Optional[Any]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        now = time.time()
+        state, last_access = entry
+        if now - last_access > self.ttl_seconds:
+            del self._sessions[session_id]
+            return None
+        self._sessions[session_id] = (state, now)
+        self._sessions.move_to_end(session_id)
+        return state
+
+    def save(self, state: Any) -> None:
+        # Callers mutate the live object, so there is no other copy to conflict with
+        now = time.time()
+        state.version += 1
+        self._sessions[state.session_id] = (state, now)
+        self._sessions.move_to_end(state.session_id)
+        self._evict(now)
+
+    def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    def idle_sessions(self, idle_seconds: float, limit: int,
+                      select: Callable[[Any, float], bool] = lambda state, last_access: True) -> List[Any]:
+        cutoff = time.time() - idle_seconds
+        found = []
+        for state, last_access in self._sessions.values():
+            if last_access > cutoff or len(found) >= limit:
+                break
+            if select(state, last_access):
+                found.append(state)
+        return found
+
+    def discard(self, session_id: str, version: int) -> bool:
+        entry = self._sessions.get(session_id)
+        if entry is None or entry[0].version != version:
+            return False
+        del self._sessions[session_id]
+        return True
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite-backed store shared by every worker process on a host.
+
+    Sessions are serialized with ``state.to_dict()`` and rebuilt with
+    ``state_cls.from_dict()``. Expired and over-cap sessions are swept at most
+    once every ``Config.SESSION_SWEEP_SECONDS``. Calls run on the event loop,
+    so a write lock held by another worker is waited on for at most
+    ``busy_timeout`` seconds before SessionStoreBusy is raised.
+    """
+
+    def __init__(self, path: str, state_cls: Any, max_sessions: int, ttl_seconds: float, busy_timeout: float = 0.25):
+        self.path = path
+        self.state_cls = state_cls
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            try:
+                yield
+            except sqlite3.OperationalError as e:
+                raise SessionStoreBusy(str(e)) from e
+
+    def _sweep(self, now: float):
+        if now - self._last_sweep < Config.SESSION_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+        self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM sessions WHERE session_id IN ("
+            "SELECT session_id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        )
+
+    def get(self, session_id: str) -> Optional[Any]:
+        now = time.time()
+        with self._locked():
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE session_id = ? AND last_access >= ?",
+                (session_id, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+        return self.state_cls.from_dict(json.loads(row[0]))
+
+    def save(self, state: Any) -> None:
+        now = time.time()
+        expected = state.version
+        state.version += 1
+        data = json.dumps(state.to_dict(), ensure_ascii=False)
+        with self._locked():
+            # Overwrite only the version this state was loaded from, or an expired row
+            cursor = self._conn.execute(
+                "INSERT INTO sessions (session_id, data, last_access) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET data = excluded.data, last_access = excluded.last_access "
+                "WHERE COALESCE(json_extract(sessions.data, '$.version'), 0) = ? OR sessions.last_access < ?",
+                (state.session_id, data, now, expected, now - self.ttl_seconds)
+            )
+            if cursor.rowcount == 0:
+                state.version = expected
+                raise SessionConflict(state.session_id)
+            self._sweep(now)
+
+    def delete(self, session_id: str) -> None:
+        with self._locked():
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def idle_sessions(self, idle_seconds: float, limit: int,
+                      select: Callable[[Any, float], bool] = lambda state, last_access: True) -> List[Any]:
+        now = time.time()
+        found = []
+        after = (0.0, "")
+        while len(found) < limit:
+            # Page through the rows so the lock is not held while sessions are deserialized
+            with self._locked():
+                rows = self._conn.execute(
+                    "SELECT session_id, data, last_access FROM sessions "
+                    "WHERE last_access >= ? AND last_access < ? AND (last_access, session_id) > (?, ?) "
+                    "ORDER BY last_access, session_id LIMIT 200",
+                    (now - self.ttl_seconds, now - idle_seconds, after[0], after[1])
+                ).fetchall()
+            if not rows:
+                break
+            for session_id, data, last_access in rows:
+                state = self.state_cls.from_dict(json.loads(data))
+                if select(state, last_access):
+                    found.append(state)
+                    if len(found) >= limit:
+                        break
+            after = (rows[-1][2], rows[-1][0])
+        return found
+
+    def discard(self, session_id: str, version: int) -> bool:
+        with self._locked():
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE session_id = ? AND COALESCE(json_extract(data, '$.version'), 0) = ?",
+                (session_id, version)
+            )
+        return cursor.rowcount > 0
+
+    def __len__(self) -> int:
+        with self._locked():
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE last_access >= ?", (time.time() - self.ttl_seconds,)
+            ).fetchone()[0]
+
+
+class RedisSessionStore(SessionStore):
+    """Redis-backed store shared by every worker on every node.
+
+    Each session is a JSON string expiring after ``ttl_seconds`` idle; a
+    sorted set of last-access times backs ``__len__`` and the
+    ``max_sessions`` cap, swept at most once every
+    ``Config.SESSION_SWEEP_SECONDS`` per worker. Calls block the event loop,
+    so each command gives up after ``timeout`` seconds and, like an
+    unreachable server, raises SessionStoreBusy.
+    """
+
+    def __init__(self, url: str, state_cls: Any, max_sessions: int, ttl_seconds: float, prefix: str = "astrologer:",
+                 timeout: float = 0.25):
+        if redis is None:
+            raise ValueError("SESSION_BACKEND=redis requires the redis package (pip install redis)")
+        self.state_cls = state_cls
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._expire = max(1, math.ceil(ttl_seconds))
+        self._prefix = f"{prefix}session:"
+        self._index = f"{prefix}sessions"
+        self._last_sweep = 0.0
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+
+    @contextmanager
+    def _guarded(self):
+        try:
+            yield
+        except redis.RedisError as e:
+            raise SessionStoreBusy(str(e)) from e
+
+    def _sweep(self, now: float):
+        if now - self._last_sweep < Config.SESSION_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+        self._client.zremrangebyscore(self._index, "-inf", now - self.ttl_seconds)
+        excess = self._client.zcard(self._index) - self.max_sessions
+        if excess > 0:
+            oldest = self._client.zrange(self._index, 0, excess - 1)
+            pipe = self._client.pipeline()
+            pipe.delete(*[self._prefix + session_id.decode() for session_id in oldest])
+            pipe.zrem(self._index, *oldest)
+            pipe.execute()
+
+    def get(self, session_id: str) -> Optional[Any]:
+        with self._guarded():
+            data = self._client.get(self._prefix + session_id)
+            if data is None:
+                return None
+            pipe = self._client.pipeline(transaction=False)
+            pipe.expire(self._prefix + session_id, self._expire)
+            pipe.zadd(self._index, {session_id: time.time()})
+            pipe.execute()
+        return self.state_cls.from_dict(json.loads(data))
+
+    def save(self, state: Any) -> None:
+        now = time.time()
+        key = self._prefix + state.session_id
+        expected = state.version
+        state.version += 1
+        data = json.dumps(state.to_dict(), ensure_ascii=False)
+        with self._guarded(), self._client.pipeline() as pipe:
+            try:
+                # Optimistic check-and-set: the write fails if the key changes after WATCH
+                pipe.watch(key)
+                stored = pipe.get(key)
+                if stored is not None and json.loads(stored).get("version", 0) != expected:
+                    raise SessionConflict(state.session_id)
+                pipe.multi()
+                pipe.set(key, data, ex=self._expire)
+                pipe.zadd(self._index, {state.session_id: now})
+                pipe.execute()
+            except (SessionConflict, redis.WatchError):
+                state.version = expected
+                raise SessionConflict(state.session_id)
+            except redis.RedisError:
+                state.version = expected
+                raise
+        try:
+            self._sweep(now)
+        except redis.RedisError:
+            # The session is saved; the sweep runs again on a later save
+            pass
+
+    def delete(self, session_id: str) -> None:
+        with self._guarded():
+            pipe = self._client.pipeline()
+            pipe.delete(self._prefix + session_id)
+            pipe.zrem(self._index, session_id)
+            pipe.execute()
+
+    def idle_sessions(self, idle_seconds: float, limit: int,
+                      select: Callable[[Any, float], bool] = lambda state, last_access: True) -> List[Any]:
+        now = time.time()
+        found = []
+        start = 0
+        while len(found) < limit:
+            with self._guarded():
+                entries = self._client.zrangebyscore(self._index, now - self.ttl_seconds, now - idle_seconds,
+                                                     start=start, num=limit, withscores=True)
+                if not entries:
+                    break
+                values = self._client.mget([self._prefix + session_id.decode() for session_id, _ in entries])
+            start += len(entries)
+            for (_, last_access), data in zip(entries, values):
+                if data is None:
+                    continue
+                state = self.state_cls.from_dict(json.loads(data))
+                if select(state, last_access):
+                    found.append(state)
+                    if len(found) >= limit:
+                        break
+        return found
+
+    def discard(self, session_id: str, version: int) -> bool:
+        key = self._prefix + session_id
+        with self._guarded(), self._client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                stored = pipe.get(key)
+                if stored is None or json.loads(stored).get("version", 0) != version:
+                    return False
+                pipe.multi()
+                pipe.delete(key)
+                pipe.zrem(self._index, session_id)
+                pipe.execute()
+            except redis.WatchError:
+                return False
+        return True
+
+    def __len__(self) -> int:
+        with self._guarded():
+            return self._client.zcount(self._index, time.time() - self.ttl_seconds, "+inf")
+
+
+class SessionLease:
+    """Holds a SessionLocks lock; ``release`` is idempotent"""
+
+    __slots__ = ("_locks", "_key")
+
+    def __init__(self, locks: "SessionLocks", key: str):
+        self._locks = locks
+        self._key = key
+
+    def release(self):
+        if self._locks is not None:
+            self._locks._release(self._key)
+            self._locks = None
+
+
+class SessionLocks:
+    """Per-session asyncio locks serializing the turns of a session within one worker.
+
+    Locks exist only while a turn holds or waits for them, so memory stays
+    bounded by the requests in flight.
+    """
+
+    def __init__(self):
+        # key -> [lock, holders and waiters]
+        self._locks: Dict[str, List[Any]] = {}
+
+    async def acquire(self, key: str, timeout: float) -> SessionLease:
+        """Wait up to ``timeout`` seconds for the lock; raises asyncio.TimeoutError"""
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            await asyncio.wait_for(entry[0].acquire(), timeout)
+        except BaseException:
+            self._forget(key, entry)
+            raise
+        return SessionLease(self, key)
+
+    def _release(self, key: str):
+        entry = self._locks[key]
+        entry[0].release()
+        self._forget(key, entry)
+
+    def _forget(self, key: str, entry: List[Any]):
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+def create_session_store(state_cls: Any) -> SessionStore:
+    """Build the session store selected by ``Config.SESSION_BACKEND``"""
+    if Config.SESSION_BACKEND == "memory":
+        return MemorySessionStore(Config.MAX_SESSIONS, Config.SESSION_TTL_SECONDS)
+    if Config.SESSION_BACKEND == "sqlite":
+        return SQLiteSessionStore(Config.SESSION_DB_PATH, state_cls, Config.MAX_SESSIONS, Config.SESSION_TTL_SECONDS,
+                                  Config.SESSION_DB_BUSY_TIMEOUT_SECONDS)
+    if Config.SESSION_BACKEND == "redis":
+        return RedisSessionStore(Config.SESSION_REDIS_URL, state_cls, Config.MAX_SESSIONS, Config.SESSION_TTL_SECONDS,
+                                 timeout=Config.SESSION_REDIS_TIMEOUT_SECONDS)
+    raise ValueError(f"Unknown SESSION_BACKEND: {Config.SESSION_BACKEND}")
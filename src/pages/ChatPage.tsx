@@ -18,6 +18,8 @@ interface ChatResponse {
   session_id: string;
   stage: string;
   suggestions: string[];
+  seq: number;
+  history_hash: string;
 }
 
 const ChatPage = () => {
@@ -25,6 +27,9 @@ const ChatPage = () => {
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [sessionId, setSessionId] = useState<string>('');
+  // Number of user turns (and their hash) the server has acknowledged
+  const [seq, setSeq] = useState<number>(0);
+  const [historyHash, setHistoryHash] = useState<string>('');
   const [currentStage, setCurrentStage] = useState<string>('greeting');
   const [suggestions, setSuggestions] = useState<string[]>([]);
   const [copiedMessageId, setCopiedMessageId] = useState<string | null>(null);
@@ -104,26 +109,35 @@ const ChatPage = () => {
     setIsLoading(true);
 
     try {
-      const response = await fetch('https://astrologer-9gwv.onrender.com/chat', {
+      const postChat = (body: object) => fetch('https://astrologer-9gwv.onrender.com/chat', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({
-          messages: [
-            ...messages.map(msg => ({
-              role: msg.role,
-              content: msg.content
-            })),
-            {
-              role: 'user',
-              content: inputMessage.trim()
-            }
-          ],
-          session_id: sessionId
-        }),
+        body: JSON.stringify(body),
       });
 
+      // Send only the new turn; the server already holds the rest
+      let response = await postChat({
+        messages: [{ role: 'user', content: userMessage.content }],
+        session_id: sessionId,
+        seq,
+        history_hash: historyHash
+      });
+
+      if (response.status === 409) {
+        // Histories diverged (e.g. the server lost the session): resync once
+        // by resending the full conversation from the start
+        response = await postChat({
+          messages: [...messages, userMessage].map(msg => ({
+            role: msg.role,
+            content: msg.content
+          })),
+          session_id: sessionId,
+          seq: 0
+        });
+      }
+
       if (!response.ok) {
         throw new Error('Failed to get response');
       }
@@ -131,6 +145,8 @@ const ChatPage = () => {
       const data: ChatResponse = await response.json();
       
       setSessionId(data.session_id);
+      setSeq(data.seq);
+      setHistoryHash(data.history_hash);
       setCurrentStage(data.stage);
       setSuggestions(data.suggestions);
       